@@ -0,0 +1,235 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from src.benchmarks.synthetic import write_sqlite
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+RESULTS_PATH = BASE_DIR / "benchmarks" / "results.jsonl"
+
+STAGES = ("ingestion", "validation", "preprocessing", "training", "evaluation")
+DEFAULT_SIZES = (10_000, 100_000)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def _max_rss_bytes():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_stages(stages, chunk_size, trace_memory=True):
+    """
+    Run the selected pipeline stages in order against DATABASE_URL.
+    A failing stage ends the run; later stages depend on its output.
+    Returns list of span dicts (with rows_per_second and max_rss_bytes).
+    """
+
+    # Imported here: the engine is bound to DATABASE_URL at import time
+    from src.ingestion.pull_batch import iter_batches
+    from src.validation.sanity_check import validate_df
+    from src.preprocessing.transform import preprocess
+    from src.training.train import train_model
+    from src.training.evaluate import evaluate_model
+    from src.orchestration.instrumentation import StageRecorder
+
+    recorder = StageRecorder(trace_memory=trace_memory)
+    spans = []
+    state = {}
+
+    def ingestion(span):
+        frames = list(iter_batches(chunk_size=chunk_size))
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        state["df"] = df
+        span.rows_out = len(df)
+
+    def validation(span):
+        span.rows_in = len(state["df"])
+        validate_df(state["df"])
+        span.rows_out = span.rows_in
+
+    def preprocessing(span):
+        span.rows_in = len(state["df"])
+        state["X"], state["y"] = preprocess(state["df"])
+        span.rows_out = len(state["X"])
+
+    def training(span):
+        span.rows_in = len(state["X"])
+        state["model"], state["X_test"], state["y_test"] = train_model(state["X"], state["y"])
+        span.rows_out = span.rows_in - len(state["X_test"])
+
+    def evaluation(span):
+        span.rows_in = len(state["X_test"])
+        state["metrics"] = evaluate_model(state["model"], state["X_test"], state["y_test"])
+        span.rows_out = span.rows_in
+
+    runners = {
+        "ingestion": ingestion,
+        "validation": validation,
+        "preprocessing": preprocessing,
+        "training": training,
+        "evaluation": evaluation,
+    }
+
+    for name in stages:
+        error = None
+        try:
+            with recorder.stage(name) as span:
+                runners[name](span)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        result = recorder.spans[-1].as_event()
+        rows = result["rows_in"] if result["rows_in"] is not None else result["rows_out"]
+        result["rows_per_second"] = (
+            rows / result["wall_seconds"] if rows and result["wall_seconds"] else None
+        )
+        result["max_rss_bytes"] = _max_rss_bytes()
+        if error is not None:
+            result["error"] = error
+        spans.append(result)
+
+        if error is not None:
+            break
+
+    return spans
+
+
+# -----------------------------
+# Sandbox
+# -----------------------------
+def _make_sandbox(root):
+    """
+    Copy of src/ and config/ with empty logs/ and models/, so benchmark
+    runs never write to the repo's event log or read its champion.
+    """
+
+    root = Path(root)
+    ignore = shutil.ignore_patterns("__pycache__")
+    shutil.copytree(BASE_DIR / "src", root / "src", ignore=ignore)
+    shutil.copytree(BASE_DIR / "config", root / "config", ignore=ignore)
+    (root / "models").mkdir()
+    (root / "logs").mkdir()
+    return root
+
+
+def _run_in_sandbox(sandbox, db_path, stages, chunk_size, trace_memory):
+    """
+    Run the stages in a fresh interpreter rooted at the sandbox (one per
+    dataset size, so max_rss_bytes is not carried over between sizes).
+    Returns list of span dicts.
+    """
+
+    cmd = [
+        sys.executable, "-m", "src.benchmarks.harness", "--worker",
+        "--stages", *stages, "--chunk-size", str(chunk_size)
+    ]
+    if not trace_memory:
+        cmd.append("--no-trace-memory")
+
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{Path(db_path).resolve()}",
+        PYTHONPATH=str(sandbox)
+    )
+    completed = subprocess.run(cmd, cwd=sandbox, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise Exception(f"Benchmark worker failed: {completed.stderr.strip()}")
+
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, stages=STAGES, chunk_size=100_000,
+                  results_path=RESULTS_PATH, db_path=None, trace_memory=True, seed=42):
+    """
+    Generate each dataset size into a SQLite stand-in for Postgres, run the
+    stages on it in a sandboxed copy of the pipeline and append one JSON
+    line per stage to results_path.
+    Returns list of result records.
+    """
+
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench-")
+    sandbox = _make_sandbox(Path(tmp_dir.name) / "pipeline")
+    if db_path is None:
+        db_path = Path(tmp_dir.name) / "bench.db"
+
+    common = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "chunk_size": chunk_size
+    }
+
+    records = []
+    try:
+        for n_rows in sizes:
+            write_sqlite(db_path, n_rows, seed=seed)
+            run_id = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+            for span in _run_in_sandbox(sandbox, db_path, stages, chunk_size, trace_memory):
+                records.append({"timestamp": run_id, "dataset_rows": n_rows, **common, **span})
+
+                results_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(results_path, "a") as f:
+                    f.write(json.dumps(records[-1]) + "\n")
+    finally:
+        tmp_dir.cleanup()
+
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="dataset sizes, e.g. 10000 100000 1000000 10000000")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="ingestion chunk size")
+    parser.add_argument("--db", help="SQLite file to use (default: temporary)")
+    parser.add_argument("--results", default=str(RESULTS_PATH))
+    parser.add_argument("--no-trace-memory", action="store_true",
+                        help="skip tracemalloc (lower overhead, RSS only)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Inside the sandbox: run against DATABASE_URL, spans as JSON on stdout
+        spans = run_stages(args.stages, args.chunk_size, not args.no_trace_memory)
+        print(json.dumps(spans))
+        sys.exit(0)
+
+    for record in run_benchmark(
+        sizes=args.rows,
+        stages=args.stages,
+        chunk_size=args.chunk_size,
+        results_path=Path(args.results),
+        db_path=args.db,
+        trace_memory=not args.no_trace_memory
+    ):
+        print(
+            f"{record['dataset_rows']:>10} rows  {record['stage']:<14}"
+            f"{record['wall_seconds']:>9.3f}s  "
+            f"{(record['rows_per_second'] or 0):>12,.0f} rows/s  "
+            f"peak {record['peak_memory_bytes'] or 0:>13,} B  "
+            f"{record['status']}{'  ' + record['error'] if 'error' in record else ''}"
+        )
@@ -0,0 +1,153 @@
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from src.validation.schema_compiler import compile_schema
+
+
+TABLE = "customer_7day_summary"
+
+# Category levels from the notebooks; the shares are illustrative only
+CATEGORIES = {
+    "loyalty_status": {"Platinum": 0.25, "Gold": 0.25, "Silver": 0.25, "Bronze": 0.25},
+    "payment_method": {"Credit Card": 0.25, "Cash": 0.25, "Debit Card": 0.25, "Mobile Payment": 0.25},
+}
+
+DISCOUNT_RATE = 0.35
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def generate_chunk(n_rows, rng, start_id=1):
+    """
+    Synthetic customer_7day_summary rows (one row per customer, 7-day means).
+    Column dtypes follow schema.yaml; every `min` constraint holds.
+    Returns DataFrame with an `id` column for watermark ingestion.
+    """
+
+    discount_applied = rng.random(n_rows) < DISCOUNT_RATE
+
+    # Means over a week of line items: unit price 2-25, 10% line discount
+    quantity = rng.uniform(1.0, 5.0, n_rows)
+    unit_price = rng.uniform(2.0, 25.0, n_rows)
+    line_net_amount = unit_price * np.where(discount_applied, 0.9, 1.0)
+    total_items = rng.uniform(1.0, 10.0, n_rows)
+
+    loyalty_status = rng.choice(
+        list(CATEGORIES["loyalty_status"]), size=n_rows,
+        p=list(CATEGORIES["loyalty_status"].values())
+    )
+    payment_method = rng.choice(
+        list(CATEGORIES["payment_method"]), size=n_rows,
+        p=list(CATEGORIES["payment_method"].values())
+    )
+
+    loyalty_uplift = pd.Series(loyalty_status).map(
+        {"Platinum": 1.15, "Gold": 1.08, "Silver": 1.03, "Bronze": 1.0}
+    ).to_numpy()
+
+    total_cost = (
+        line_net_amount * total_items * 0.45 * loyalty_uplift
+        + quantity * 2.0
+        + rng.normal(0.0, 3.0, n_rows)
+    )
+
+    df = pd.DataFrame({
+        "id": np.arange(start_id, start_id + n_rows, dtype=np.int64),
+        "quantity": quantity,
+        "line_net_amount": line_net_amount,
+        "total_items": total_items,
+        "total_cost": total_cost,
+        "loyalty_status": loyalty_status.astype(object),
+        "payment_method": payment_method.astype(object),
+        "discount_applied": discount_applied,
+    })
+
+    for col, minimum in compile_schema().min_constraints.items():
+        if col in df.columns:
+            df[col] = df[col].clip(lower=minimum)
+
+    return df
+
+
+def iter_synthetic(n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42):
+    """
+    Yield synthetic chunks totalling n_rows, so 10M rows never sit in memory
+    at once. Same seed and chunk size give the same data.
+    """
+
+    rng = np.random.default_rng(seed)
+    produced = 0
+    while produced < n_rows:
+        size = min(chunk_rows, n_rows - produced)
+        yield generate_chunk(size, rng, start_id=produced + 1)
+        produced += size
+
+
+# -----------------------------
+# SQLite stand-in for Postgres
+# -----------------------------
+def write_sqlite(path, n_rows, chunk_rows=DEFAULT_CHUNK_ROWS, seed=42):
+    """
+    (Re)create customer_7day_summary and pipeline_state in a SQLite file.
+    Returns number of rows written.
+    """
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(f"""
+            DROP TABLE IF EXISTS {TABLE};
+            DROP TABLE IF EXISTS pipeline_state;
+
+            CREATE TABLE {TABLE} (
+                id INTEGER PRIMARY KEY,
+                quantity FLOAT CHECK (quantity >= 0),
+                line_net_amount FLOAT CHECK (line_net_amount >= 0),
+                total_items FLOAT CHECK (total_items >= 0),
+                total_cost FLOAT CHECK (total_cost >= 0),
+                loyalty_status TEXT,
+                payment_method TEXT,
+                discount_applied BOOLEAN
+            );
+
+            CREATE TABLE pipeline_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+
+        columns = [
+            "id", "quantity", "line_net_amount", "total_items", "total_cost",
+            "loyalty_status", "payment_method", "discount_applied"
+        ]
+        sql = f"INSERT INTO {TABLE} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+        written = 0
+        for chunk in iter_synthetic(n_rows, chunk_rows, seed):
+            chunk["discount_applied"] = chunk["discount_applied"].astype(int)
+            conn.executemany(sql, chunk[columns].itertuples(index=False, name=None))
+            conn.commit()
+            written += len(chunk)
+
+        return written
+
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic customer_7day_summary data.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--sqlite", help="write into this SQLite file")
+    parser.add_argument("--csv", help="write into this CSV file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.sqlite:
+        print(f"Wrote {write_sqlite(args.sqlite, args.rows, seed=args.seed)} rows to {args.sqlite}")
+
+    if args.csv:
+        for i, chunk in enumerate(iter_synthetic(args.rows, seed=args.seed)):
+            chunk.drop(columns="id").to_csv(args.csv, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        print(f"Wrote {args.rows} rows to {args.csv}")
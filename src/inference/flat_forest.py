@@ -0,0 +1,331 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots", "missing_left")
+# Vocabulary of the encoder in front of the forest, written last: an
+# export that has it can be served without the pickled model
+ENCODER_FILE = "encoder.json"
+
+# Rows traversed per step; bounds the (rows x trees) node-index matrix
+ROW_CHUNK = 4096
+
+
+class FlatForest:
+    """
+    Tree ensemble flattened into contiguous node arrays.
+    All trees are traversed together for a batch with vectorized NumPy,
+    one tree level per step. Leaves point to themselves, so finished
+    paths simply stay put until the deepest tree is done.
+    NaN inputs follow missing_left per node, as in sklearn's trees.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots,
+                 max_depth, missing_left=None, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+
+        # Exports from before NaN routing was recorded: NaN goes right
+        if missing_left is None:
+            missing_left = np.zeros(len(feature), dtype=bool)
+        self.missing_left = missing_left
+
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def _to_matrix(self, X):
+        if isinstance(X, pd.DataFrame) and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)]
+
+        # sklearn trees compare float32 inputs against float64 thresholds
+        return np.asarray(X, dtype=np.float32)
+
+    def predict(self, X):
+        X = self._to_matrix(X)
+        predictions = np.empty(len(X), dtype=np.float64)
+
+        for start in range(0, len(X), ROW_CHUNK):
+            chunk = X[start:start + ROW_CHUNK]
+            rows = np.arange(len(chunk))[:, None]
+            nodes = np.broadcast_to(self.roots, (len(chunk), self.n_trees)).copy()
+
+            for _ in range(self.max_depth):
+                x = chunk[rows, self.feature[nodes]]
+                go_left = (x <= self.threshold[nodes]) | (np.isnan(x) & self.missing_left[nodes])
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+
+            predictions[start:start + len(chunk)] = self.value[nodes].mean(axis=1)
+
+        return predictions
+
+
+class SmallBatchDispatcher:
+    """
+    Score small batches with the flat engine and larger ones with the
+    sklearn model, whose joblib tree parallelism wins once the batch is big.
+    Given load_model instead of a model, the estimator is loaded on the
+    first large batch only, so a process that only scores small batches
+    never holds more than the (memory-mapped) flat arrays.
+    """
+
+    def __init__(self, model, flat: FlatForest, max_rows=256, load_model=None):
+        self._model = model
+        self._load_model = load_model
+        self._load_lock = threading.Lock()
+        self.flat = flat
+        self.max_rows = max_rows
+
+        source = model if model is not None else flat
+        if hasattr(source, "feature_names_in_"):
+            self.feature_names_in_ = source.feature_names_in_
+
+    @property
+    def model(self):
+        if self._model is None and self._load_model is not None:
+            with self._load_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def predict(self, X):
+        if len(X) <= self.max_rows:
+            return self.flat.predict(X)
+        return self.model.predict(X)
+
+
+# -----------------------------
+# Flattening
+# -----------------------------
+def _estimators(model):
+    # Forests expose estimators_; a single regression tree is its own forest
+    if hasattr(model, "estimators_") and hasattr(model, "n_estimators"):
+        estimators = list(model.estimators_)
+    elif hasattr(model, "tree_"):
+        estimators = [model]
+    else:
+        return None
+
+    for estimator in estimators:
+        tree = getattr(estimator, "tree_", None)
+        if tree is None or tree.n_outputs != 1 or tree.value.shape[2] != 1:
+            return None
+
+    return estimators
+
+
+def can_flatten(model):
+    # Gradient boosting sums scaled trees; only averaged ensembles are supported
+    return type(model).__name__ in {
+        "RandomForestRegressor",
+        "ExtraTreesRegressor",
+        "DecisionTreeRegressor",
+        "ExtraTreeRegressor",
+    } and _estimators(model) is not None
+
+
+def flatten_forest(model):
+    """
+    Convert a fitted sklearn forest/tree regressor into a FlatForest.
+    Returns FlatForest or None if the model type is not supported.
+    """
+
+    if not can_flatten(model):
+        return None
+
+    estimators = _estimators(model)
+    n_nodes = sum(e.tree_.node_count for e in estimators)
+    index_dtype = np.int32 if n_nodes < np.iinfo(np.int32).max else np.int64
+
+    features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+
+    for estimator in estimators:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count) + offset
+        is_leaf = tree.children_left == -1
+
+        features.append(np.where(is_leaf, 0, tree.feature))
+        thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+        lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+        rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+        values.append(tree.value[:, 0, 0])
+        # Older sklearn rejects NaN inputs, so there is no routing to record
+        missing.append(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)) != 0)
+        roots.append(offset)
+
+        max_depth = max(max_depth, tree.max_depth)
+        offset += tree.node_count
+
+    return FlatForest(
+        feature=np.concatenate(features).astype(index_dtype),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts).astype(index_dtype),
+        right=np.concatenate(rights).astype(index_dtype),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=index_dtype),
+        max_depth=max_depth,
+        missing_left=np.concatenate(missing),
+        feature_names=getattr(model, "feature_names_in_", None)
+    )
+
+
+def sample_inputs(flat: FlatForest, n_rows=512, random_state=0):
+    """
+    Build inputs that exercise both sides of many split thresholds.
+    Returns a float32 matrix shaped like the model's input.
+    """
+
+    rng = np.random.RandomState(random_state)
+    n_features = int(flat.feature.max()) + 1
+    if hasattr(flat, "feature_names_in_"):
+        n_features = len(flat.feature_names_in_)
+
+    X = np.zeros((n_rows, n_features), dtype=np.float32)
+    internal = flat.left != np.arange(len(flat.left))
+
+    for col in range(n_features):
+        # Trees fitted on NaNs split "missing vs. rest" at threshold inf
+        splits = flat.threshold[internal & (flat.feature == col) & np.isfinite(flat.threshold)]
+        if len(splits) == 0:
+            continue
+        picks = rng.choice(splits, size=n_rows)
+        X[:, col] = picks + rng.choice([-1e-3, 1e-3], size=n_rows) * (np.abs(picks) + 1)
+
+    return X
+
+
+def check_parity(model, flat: FlatForest, X=None, rtol=1e-7, atol=1e-9):
+    """
+    Compare FlatForest predictions with the sklearn model.
+    Returns (ok, max_abs_diff).
+    """
+
+    if X is None:
+        X = sample_inputs(flat)
+        if hasattr(flat, "feature_names_in_"):
+            X = pd.DataFrame(X, columns=list(flat.feature_names_in_))
+
+    expected = model.predict(X)
+    actual = flat.predict(X)
+
+    max_abs_diff = float(np.max(np.abs(expected - actual))) if len(expected) else 0.0
+    return bool(np.allclose(expected, actual, rtol=rtol, atol=atol)), max_abs_diff
+
+
+# -----------------------------
+# Persistence
+# -----------------------------
+def save_flat_forest(flat: FlatForest, directory):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    for name in ARRAY_NAMES:
+        np.save(directory / f"{name}.npy", getattr(flat, name), allow_pickle=False)
+
+    meta = {
+        "max_depth": flat.max_depth,
+        "n_trees": flat.n_trees,
+        "feature_names": (
+            [str(c) for c in flat.feature_names_in_]
+            if hasattr(flat, "feature_names_in_") else None
+        )
+    }
+    with open(directory / "meta.json", "w") as f:
+        json.dump(meta, f, indent=4)
+
+
+def load_flat_forest(directory, mmap=True):
+    """
+    Load a FlatForest saved by save_flat_forest.
+    With mmap=True the node arrays are shared page-cache memory across
+    every process that serves the same version.
+    """
+
+    directory = Path(directory)
+
+    with open(directory / "meta.json", "r") as f:
+        meta = json.load(f)
+
+    arrays = {
+        name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None)
+        for name in ARRAY_NAMES
+        if (directory / f"{name}.npy").exists() or name != "missing_left"
+    }
+
+    return FlatForest(
+        max_depth=meta["max_depth"],
+        feature_names=meta.get("feature_names"),
+        **arrays
+    )
+
+
+# -----------------------------
+# Latency comparison
+# -----------------------------
+def compare_latency(model, flat: FlatForest, batch_sizes=(1, 10, 100, 1000), repeats=20):
+    """
+    Time model.predict vs FlatForest.predict per batch size.
+    Returns list of dicts with median milliseconds per call.
+    """
+
+    results = []
+    for batch_size in batch_sizes:
+        X = sample_inputs(flat, n_rows=batch_size)
+        if hasattr(flat, "feature_names_in_"):
+            X = pd.DataFrame(X, columns=list(flat.feature_names_in_))
+
+        timings = {}
+        for label, predict in (("sklearn", model.predict), ("flat", flat.predict)):
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                predict(X)
+                samples.append((time.perf_counter() - started) * 1000.0)
+            timings[label] = float(np.median(samples))
+
+        results.append({
+            "batch_size": batch_size,
+            "sklearn_ms": timings["sklearn"],
+            "flat_ms": timings["flat"],
+            "speedup": timings["sklearn"] / timings["flat"] if timings["flat"] else None
+        })
+
+    return results
+
+
+if __name__ == "__main__":
+    from src.registry.artifacts import load_model
+    from src.registry.blob_store import resolve
+    from src.registry.promotion import PROMOTED_DIR, CURRENT_MODEL_FILE
+    from src.preprocessing.encoding import unwrap
+
+    version = CURRENT_MODEL_FILE.read_text().strip()
+    _, champion = unwrap(load_model(resolve(PROMOTED_DIR / version)))
+    flattened = flatten_forest(champion)
+
+    if flattened is None:
+        print(f"{version}: {type(champion).__name__} cannot be flattened.")
+    else:
+        ok, diff = check_parity(champion, flattened)
+        print(f"{version}: parity {'ok' if ok else 'FAILED'} (max abs diff {diff:.3e})")
+        for row in compare_latency(champion, flattened):
+            print(row)
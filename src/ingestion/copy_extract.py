@@ -0,0 +1,58 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from src.validation.schema_compiler import compile_schema
+
+
+# schema.yaml dtype -> column type parsed straight out of the COPY stream.
+# int columns are left to the parser: int64, or float64 when they hold
+# NULLs (same as read_sql); booleans arrive as t/f text.
+_CSV_DTYPES = {
+    "float": np.float64,
+    "string": object,
+    "boolean": object,
+}
+
+
+def _column_dtypes(plan):
+    dtypes = {"id": np.int64}
+
+    for col, expected in plan.dtypes.items():
+        if expected in _CSV_DTYPES:
+            dtypes[col] = _CSV_DTYPES[expected]
+
+    return dtypes
+
+
+def _parse_csv(buffer):
+    """
+    Parse a COPY CSV stream into typed columns in one pass of the C parser.
+    Returns DataFrame.
+    """
+
+    plan = compile_schema()
+
+    df = pd.read_csv(buffer, dtype=_column_dtypes(plan), keep_default_na=False, na_values=[""])
+
+    return plan.coerce_booleans(df)
+
+
+def copy_select(conn, sql, params=None):
+    """
+    Run a SELECT through `COPY (...) TO STDOUT` on the psycopg2 connection
+    behind a SQLAlchemy connection, inside its current transaction.
+    sql uses psycopg2 placeholders (%(name)s).
+    Returns DataFrame.
+    """
+
+    dbapi_conn = conn.connection.dbapi_connection
+    buffer = io.BytesIO()
+
+    with dbapi_conn.cursor() as cursor:
+        select = cursor.mogrify(sql, params).decode()
+        cursor.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER true)", buffer)
+
+    buffer.seek(0)
+    return _parse_csv(buffer)
@@ -1,12 +1,56 @@
 import os
+import yaml
+from pathlib import Path
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from dotenv import load_dotenv
 
 load_dotenv()
 
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL not set")
 
-engine = create_engine(DATABASE_URL)
+
+def _load_database_config():
+    with open(CONFIG_DIR / "pipeline.yaml", "r") as f:
+        return (yaml.safe_load(f) or {}).get("database", {}) or {}
+
+
+def _engine_options(url, database_config):
+    """
+    Pool and session settings for create_engine.
+    Pool sizing and the statement timeout only apply to Postgres; SQLite
+    keeps SQLAlchemy's defaults.
+    """
+
+    options = {"pool_pre_ping": database_config.get("pool_pre_ping", True)}
+
+    if url.get_backend_name() != "postgresql":
+        return options
+
+    options["pool_size"] = database_config.get("pool_size", 5)
+    options["max_overflow"] = database_config.get("max_overflow", 5)
+
+    pool_recycle = database_config.get("pool_recycle_seconds")
+    if pool_recycle is not None:
+        options["pool_recycle"] = pool_recycle
+
+    # Server-side cap per statement, so a stuck query cannot hold a run forever
+    statement_timeout_ms = database_config.get("statement_timeout_ms")
+    if statement_timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout_ms)}"}
+
+    return options
+
+
+_url = make_url(DATABASE_URL)
+
+engine = create_engine(DATABASE_URL, **_engine_options(_url, _load_database_config()))
+
+# COPY bulk extraction needs psycopg2; everything else goes through SQLAlchemy
+SUPPORTS_COPY = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
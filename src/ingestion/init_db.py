@@ -1,5 +1,6 @@
 from sqlalchemy import text
 from src.ingestion.db import engine
+from src.ingestion.leases import create_leases_table
 
 def init_database():
     with engine.begin() as conn:
@@ -33,3 +34,8 @@ def init_database():
                 value TEXT
             );
         """))
+
+        # -----------------------------
+        # INGESTION LEASES TABLE
+        # -----------------------------
+        create_leases_table(conn)
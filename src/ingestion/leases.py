@@ -0,0 +1,227 @@
+import os
+import socket
+import time
+import uuid
+
+from sqlalchemy import text
+from src.ingestion.db import engine
+from src.logging.event_logger import log_message, log_event
+
+
+LEASES_TABLE = "ingestion_leases"
+
+# Highest id handed out in a lease; rows above it are unclaimed
+HIGH_WATER_KEY = "lease_high_water"
+
+DEFAULT_LEASE_ROWS = 10000
+DEFAULT_LEASE_TTL_SECONDS = 900
+
+# Claims of one range before it is set aside as 'failed' (dead letter)
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+def create_leases_table(conn):
+    """
+    One row per claimed id range [start_id, end_id]. Ranges never overlap,
+    so start_id doubles as the key. status is active, done, or failed
+    (claimed max_attempts times without finishing; skipped from then on).
+    """
+
+    conn.execute(text(f"""
+        CREATE TABLE IF NOT EXISTS {LEASES_TABLE} (
+            start_id BIGINT PRIMARY KEY,
+            end_id BIGINT NOT NULL,
+            status TEXT NOT NULL,
+            owner TEXT,
+            attempts INTEGER NOT NULL DEFAULT 1,
+            expires_at DOUBLE PRECISION NOT NULL,
+            completed_at DOUBLE PRECISION
+        );
+    """))
+
+    conn.execute(text(f"""
+        CREATE INDEX IF NOT EXISTS {LEASES_TABLE}_status_idx
+        ON {LEASES_TABLE} (status, expires_at);
+    """))
+
+
+def new_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _locking(conn, clause):
+    # SQLite has no row locks (writers are serialized by the database lock)
+    return f" {clause}" if conn.dialect.name == "postgresql" else ""
+
+
+def _dead_letter(conn, start_id, end_id, owner, attempts):
+    conn.execute(text(f"""
+        UPDATE {LEASES_TABLE} SET status = 'failed', completed_at = :now
+        WHERE start_id = :start_id
+    """), {"now": time.time(), "start_id": start_id})
+
+    log_message(f"Lease {start_id}-{end_id} failed after {attempts} attempts; skipping it.")
+    log_event("LEASE_DEAD_LETTERED", {
+        "start_id": int(start_id),
+        "end_id": int(end_id),
+        "last_owner": owner,
+        "attempts": int(attempts)
+    })
+
+
+def _reclaim_expired(conn, worker_id, expires_at, now, max_attempts):
+    """
+    Take over one expired lease (its worker crashed or gave up).
+    Rows locked by a worker reclaiming at the same time are skipped.
+    A range already claimed max_attempts times is dead-lettered instead,
+    so one bad range cannot block every later run.
+    Returns (start_id, end_id) or None.
+    """
+
+    while True:
+        row = conn.execute(text(f"""
+            SELECT start_id, end_id, owner, attempts FROM {LEASES_TABLE}
+            WHERE status = 'active' AND expires_at < :now
+            ORDER BY start_id
+            LIMIT 1{_locking(conn, "FOR UPDATE SKIP LOCKED")}
+        """), {"now": now}).fetchone()
+
+        if row is None:
+            return None
+
+        start_id, end_id, owner, attempts = row
+        if attempts >= max_attempts:
+            _dead_letter(conn, start_id, end_id, owner, attempts)
+            continue
+
+        conn.execute(text(f"""
+            UPDATE {LEASES_TABLE}
+            SET owner = :owner, expires_at = :expires_at, attempts = attempts + 1
+            WHERE start_id = :start_id
+        """), {"owner": worker_id, "expires_at": expires_at, "start_id": start_id})
+
+        log_event("LEASE_RECLAIMED", {
+            "start_id": int(start_id),
+            "end_id": int(end_id),
+            "previous_owner": owner,
+            "owner": worker_id,
+            "attempt": int(attempts) + 1
+        })
+
+        return int(start_id), int(end_id)
+
+
+def _claim_new_range(conn, worker_id, lease_rows, expires_at):
+    """
+    Cut the next range of up to lease_rows ids above the high-water mark.
+    The high-water row is locked only for this short allocation.
+    Returns (start_id, end_id) or None when there are no unclaimed rows.
+    """
+
+    # Seeded from the single-watermark state, so switching modes does not
+    # re-read rows the batch/stream modes already consumed
+    conn.execute(text(f"""
+        INSERT INTO pipeline_state (key, value)
+        SELECT '{HIGH_WATER_KEY}', COALESCE(
+            (SELECT value FROM pipeline_state WHERE key = 'last_processed_id'), '0'
+        )
+        ON CONFLICT (key) DO NOTHING
+    """))
+
+    high_water = int(conn.execute(text(f"""
+        SELECT value FROM pipeline_state WHERE key = '{HIGH_WATER_KEY}'{_locking(conn, "FOR UPDATE")}
+    """)).fetchone()[0])
+
+    end_id = conn.execute(text("""
+        SELECT MAX(id) FROM (
+            SELECT id FROM customer_7day_summary
+            WHERE id > :high_water
+            ORDER BY id
+            LIMIT :limit
+        ) AS next_range
+    """), {"high_water": high_water, "limit": lease_rows}).scalar()
+
+    if end_id is None:
+        return None
+
+    conn.execute(text(f"""
+        INSERT INTO {LEASES_TABLE} (start_id, end_id, status, owner, expires_at)
+        VALUES (:start_id, :end_id, 'active', :owner, :expires_at)
+    """), {
+        "start_id": high_water + 1,
+        "end_id": int(end_id),
+        "owner": worker_id,
+        "expires_at": expires_at
+    })
+
+    conn.execute(
+        text(f"UPDATE pipeline_state SET value = :val WHERE key = '{HIGH_WATER_KEY}'"),
+        {"val": str(int(end_id))}
+    )
+
+    return high_water + 1, int(end_id)
+
+
+def claim_lease(worker_id, lease_rows=DEFAULT_LEASE_ROWS, ttl_seconds=DEFAULT_LEASE_TTL_SECONDS,
+                max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Claim an id range for this worker: an expired lease first, otherwise
+    a fresh range past the high-water mark. Committed before returning,
+    so other workers see the claim immediately.
+    Returns (start_id, end_id) or None if there is nothing to claim.
+    """
+
+    now = time.time()
+    expires_at = now + ttl_seconds
+
+    with engine.begin() as conn:
+        lease = _reclaim_expired(conn, worker_id, expires_at, now, max_attempts)
+        if lease is None:
+            lease = _claim_new_range(conn, worker_id, lease_rows, expires_at)
+
+    if lease is not None:
+        log_event("LEASE_CLAIMED", {
+            "start_id": lease[0],
+            "end_id": lease[1],
+            "owner": worker_id,
+            "expires_at": expires_at
+        })
+
+    return lease
+
+
+def complete_lease(start_id, worker_id):
+    """
+    Mark a lease done.
+    Fails (returns False) if the lease expired and another worker took it;
+    that worker reads the same rows again (delivery is at-least-once).
+    """
+
+    with engine.begin() as conn:
+        result = conn.execute(text(f"""
+            UPDATE {LEASES_TABLE} SET status = 'done', completed_at = :now
+            WHERE start_id = :start_id AND owner = :owner AND status = 'active'
+        """), {"now": time.time(), "start_id": start_id, "owner": worker_id})
+
+    if result.rowcount != 1:
+        log_message(f"Lease {start_id} was reclaimed by another worker; its rows may be ingested twice.")
+        log_event("LEASE_LOST", {"start_id": start_id, "owner": worker_id})
+        return False
+
+    return True
+
+
+def abandon_lease(start_id, worker_id):
+    """
+    Give a lease back unfinished (e.g. its chunk failed validation).
+    It expires immediately, so the next claim retries it; the attempt
+    count still applies, so a range that keeps failing is dead-lettered.
+    """
+
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            UPDATE {LEASES_TABLE} SET expires_at = 0
+            WHERE start_id = :start_id AND owner = :owner AND status = 'active'
+        """), {"start_id": start_id, "owner": worker_id})
+
+    log_event("LEASE_ABANDONED", {"start_id": start_id, "owner": worker_id})
@@ -1,12 +1,29 @@
+import yaml
+from pathlib import Path
 import pandas as pd
 from sqlalchemy import text
-from src.ingestion.db import engine
+from src.ingestion.db import engine, SUPPORTS_COPY
+from src.ingestion.copy_extract import copy_select
+from src.validation.schema_compiler import compile_schema
+from src.ingestion.leases import (
+    claim_lease, complete_lease, abandon_lease, new_worker_id,
+    DEFAULT_LEASE_ROWS, DEFAULT_LEASE_TTL_SECONDS, DEFAULT_MAX_ATTEMPTS
+)
 from src.logging.event_logger import log_message, log_event
 
 
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+
+# Fallback when config/pipeline.yaml does not set micro_batch_size
 MICRO_BATCH_SIZE = 10
 
 
+def _load_pipeline_config():
+    with open(CONFIG_DIR / "pipeline.yaml", "r") as f:
+        return yaml.safe_load(f) or {}
+
+
 def _get_last_processed_id(conn):
     result = conn.execute(
         text("SELECT value FROM pipeline_state WHERE key='last_processed_id'")
@@ -28,34 +45,85 @@ def _update_last_processed_id(conn, new_id):
     )
 
 
+_BATCH_QUERY = text("""
+    SELECT * FROM customer_7day_summary
+    WHERE id > :last_id
+    ORDER BY id
+    LIMIT :limit
+""")
+
+# Same query with psycopg2 placeholders, for COPY
+_COPY_QUERY = """
+    SELECT * FROM customer_7day_summary
+    WHERE id > %(last_id)s
+    ORDER BY id
+    LIMIT %(limit)s
+"""
+
+_RANGE_QUERY = text("""
+    SELECT * FROM customer_7day_summary
+    WHERE id BETWEEN :start_id AND :end_id
+    ORDER BY id
+""")
+
+_COPY_RANGE_QUERY = """
+    SELECT * FROM customer_7day_summary
+    WHERE id BETWEEN %(start_id)s AND %(end_id)s
+    ORDER BY id
+"""
+
+
+def _use_copy(ingestion_config):
+    # SQLite (local runs, benchmarks) always takes the SQLAlchemy path
+    return ingestion_config.get("backend", "copy") == "copy" and SUPPORTS_COPY
+
+
+def _read_chunk(conn, last_id, limit, use_copy):
+    """
+    Read up to `limit` rows past the watermark, in the caller's transaction.
+    Returns DataFrame.
+    """
+
+    params = {"last_id": last_id, "limit": limit}
+
+    if use_copy:
+        return copy_select(conn, _COPY_QUERY, params)
+
+    # SQLite returns BOOLEAN columns as 0/1
+    return compile_schema().coerce_booleans(pd.read_sql(_BATCH_QUERY, conn, params=params))
+
+
+def _read_range(conn, start_id, end_id, use_copy):
+    params = {"start_id": start_id, "end_id": end_id}
+
+    if use_copy:
+        return copy_select(conn, _COPY_RANGE_QUERY, params)
+
+    return compile_schema().coerce_booleans(pd.read_sql(_RANGE_QUERY, conn, params=params))
+
+
 def pull_batch():
     """
     Pull micro-batch from Postgres.
     Returns DataFrame or None.
     """
 
+    pipeline_config = _load_pipeline_config()
+    batch_size = pipeline_config.get("micro_batch_size", MICRO_BATCH_SIZE)
+    use_copy = _use_copy(pipeline_config.get("ingestion", {}))
+
     with engine.begin() as conn:
 
         last_id = _get_last_processed_id(conn)
 
-        query = text("""
-            SELECT * FROM customer_7day_summary
-            WHERE id > :last_id
-            ORDER BY id
-            LIMIT :limit
-        """)
-
-        df = pd.read_sql(query, conn, params={
-            "last_id": last_id,
-            "limit": MICRO_BATCH_SIZE
-        })
+        df = _read_chunk(conn, last_id, batch_size, use_copy)
 
         if df.empty:
             log_message("No new data found in Postgres.")
             log_event("NO_DATA", {"last_id": last_id})
             return None
 
-        new_last_id = df["id"].max()
+        new_last_id = int(df["id"].max())
         _update_last_processed_id(conn, new_last_id)
 
         log_message(f"Ingested {len(df)} rows from Postgres.")
@@ -64,7 +132,132 @@ def pull_batch():
             "previous_last_id": last_id,
             "new_last_id": new_last_id
         })
-        df = df.drop(columns=["id", "created_at"], errors="ignore")
+        df = df.drop(columns=["created_at"], errors="ignore")
 
 
         return df
+
+
+def iter_batches(chunk_size=None, max_chunks=None):
+    """
+    Stream the Postgres backlog as DataFrame chunks (keyset pagination).
+    Each chunk (at most chunk_size rows, read whole) is fetched in its own
+    transaction, and the watermark is committed when the consumer asks for
+    the next chunk. Only one chunk is held here at a time; whether the
+    backlog as a whole fits in memory is up to the consumer.
+    Stopping early rolls back the chunk in hand, so it is re-read next run.
+    """
+
+    ingestion_config = _load_pipeline_config().get("ingestion", {})
+    chunk_size = chunk_size or ingestion_config.get("chunk_size", MICRO_BATCH_SIZE)
+    if max_chunks is None:
+        max_chunks = ingestion_config.get("max_chunks")
+
+    use_copy = _use_copy(ingestion_config)
+
+    chunks = 0
+    total_rows = 0
+
+    while max_chunks is None or chunks < max_chunks:
+
+        with engine.begin() as conn:
+
+            last_id = _get_last_processed_id(conn)
+
+            df = _read_chunk(conn, last_id, chunk_size, use_copy)
+
+            if df.empty:
+                break
+
+            new_last_id = int(df["id"].max())
+            _update_last_processed_id(conn, new_last_id)
+
+            log_event("DATA_INGESTED", {
+                "rows": len(df),
+                "chunk": chunks,
+                "previous_last_id": last_id,
+                "new_last_id": new_last_id
+            })
+
+            # id stays: the training store dedupes re-read rows on it
+            yield df.drop(columns=["created_at"], errors="ignore")
+
+        chunks += 1
+        total_rows += len(df)
+
+    if chunks == 0:
+        log_message("No new data found in Postgres.")
+        log_event("NO_DATA", {"mode": "stream"})
+    else:
+        log_message(f"Streamed {total_rows} rows from Postgres in {chunks} chunks.")
+
+
+def iter_leased_batches(worker_id=None, lease_rows=None, max_chunks=None):
+    """
+    Consume the backlog as id-range leases, so several workers can ingest
+    disjoint ranges at the same time. Each lease is claimed (and committed)
+    up front, read, and marked done when the consumer asks for the next
+    chunk. If the consumer stops on a chunk (e.g. validation rejects it),
+    the lease is handed back for retry; a crashed worker's lease is
+    reclaimed once it expires. After max_attempts claims a range is
+    dead-lettered and ingestion moves on.
+    Delivery is at-least-once: a lease that expires while its chunk is
+    still being processed can be read again by another worker.
+    """
+
+    ingestion_config = _load_pipeline_config().get("ingestion", {})
+    lease_config = ingestion_config.get("lease", {})
+    lease_rows = lease_rows or lease_config.get("rows", DEFAULT_LEASE_ROWS)
+    ttl_seconds = lease_config.get("ttl_seconds", DEFAULT_LEASE_TTL_SECONDS)
+    max_attempts = lease_config.get("max_attempts", DEFAULT_MAX_ATTEMPTS)
+    if max_chunks is None:
+        max_chunks = ingestion_config.get("max_chunks")
+
+    worker_id = worker_id or new_worker_id()
+    use_copy = _use_copy(ingestion_config)
+
+    chunks = 0
+    total_rows = 0
+    lost = 0
+
+    while max_chunks is None or chunks < max_chunks:
+
+        lease = claim_lease(worker_id, lease_rows, ttl_seconds, max_attempts)
+        if lease is None:
+            break
+
+        start_id, end_id = lease
+
+        with engine.begin() as conn:
+            df = _read_range(conn, start_id, end_id, use_copy)
+
+        log_event("DATA_INGESTED", {
+            "rows": len(df),
+            "chunk": chunks,
+            "start_id": start_id,
+            "end_id": end_id,
+            "owner": worker_id
+        })
+
+        if not df.empty:
+            try:
+                # id stays: the training store dedupes re-delivered rows on it
+                yield df.drop(columns=["created_at"], errors="ignore")
+            except GeneratorExit:
+                abandon_lease(start_id, worker_id)
+                raise
+
+        if not complete_lease(start_id, worker_id):
+            lost += 1
+
+        chunks += 1
+        total_rows += len(df)
+
+    if chunks == 0:
+        log_message("No unclaimed data found in Postgres.")
+        log_event("NO_DATA", {"mode": "lease", "owner": worker_id})
+    else:
+        log_message(
+            f"Ingested {total_rows} rows from {chunks} leases as {worker_id}"
+            f"{f' ({lost} lost to other workers)' if lost else ''}."
+        )
@@ -1,26 +1,185 @@
+import atexit
+import fcntl
 import json
+import os
+import re
+import threading
 from datetime import datetime
 from pathlib import Path
 
+import yaml
+
 # Define log file paths
 BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
 LOG_DIR = BASE_DIR / "logs"
 
 HUMAN_LOG = LOG_DIR / "retraining.log"
 EVENT_LOG = LOG_DIR / "events.jsonl"
 
+DEFAULT_LOGGING_CONFIG = {
+    "flush_records": 100,
+    "flush_interval_seconds": 1.0,
+    "max_segment_bytes": 10 * 1024 * 1024
+}
+
+
+def _load_logging_config():
+    try:
+        with open(CONFIG_DIR / "pipeline.yaml", "r") as f:
+            config = yaml.safe_load(f) or {}
+        overrides = config.get("logging") or {}
+        return {key: overrides.get(key, default) for key, default in DEFAULT_LOGGING_CONFIG.items()}
+    except Exception:
+        return dict(DEFAULT_LOGGING_CONFIG)
+
 
 def _timestamp():
     return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
 
+def segment_paths(path):
+    """
+    Rotated segments of a log file, oldest first.
+    events.jsonl rotates to events.000001.jsonl, events.000002.jsonl, ...
+    """
+
+    path = Path(path)
+    pattern = re.compile(rf"{re.escape(path.stem)}\.(\d{{6}}){re.escape(path.suffix)}")
+
+    segments = []
+    for candidate in path.parent.glob(f"{path.stem}.*{path.suffix}"):
+        match = pattern.fullmatch(candidate.name)
+        if match:
+            segments.append((int(match.group(1)), candidate))
+
+    return [p for _, p in sorted(segments)]
+
+
+class BufferedLogWriter:
+    """
+    Append lines to a log file from a background thread.
+    Lines are flushed when flush_records are pending, every
+    flush_interval_seconds, and at interpreter exit. The active file is
+    rotated into a numbered segment once it exceeds max_segment_bytes.
+    Rotate + append hold an flock on a sidecar lock file, so several
+    processes (e.g. uvicorn workers) can share one log.
+    """
+
+    def __init__(self, path, flush_records=100, flush_interval_seconds=1.0,
+                 max_segment_bytes=10 * 1024 * 1024):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(f".{self.path.name}.lock")
+        self.flush_records = flush_records
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_segment_bytes = max_segment_bytes
+
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_thread(self):
+        # A forked child inherits the parent's buffer but not its thread
+        if self._pid == os.getpid():
+            return
+
+        self._pid = os.getpid()
+        self._buffer = []
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"log-writer-{self.path.name}", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, line):
+        with self._lock:
+            self._ensure_thread()
+            self._buffer.append(line)
+            full = len(self._buffer) >= self.flush_records
+
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+
+        if not lines:
+            return
+
+        data = "".join(lines)
+
+        with self._io_lock:
+            try:
+                with open(self.lock_path, "a") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        self._rotate_if_needed(len(data))
+                        with open(self.path, "a") as f:
+                            f.write(data)
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+            except Exception:
+                # Logging must never crash pipeline
+                pass
+
+    def _rotate_if_needed(self, incoming_bytes):
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+
+        if size == 0 or size + incoming_bytes <= self.max_segment_bytes:
+            return
+
+        segments = segment_paths(self.path)
+        index = int(segments[-1].name.split(".")[-2]) + 1 if segments else 1
+        os.replace(self.path, self.path.with_name(f"{self.path.stem}.{index:06d}{self.path.suffix}"))
+
+    def close(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+_config = _load_logging_config()
+_human_writer = BufferedLogWriter(HUMAN_LOG, **_config)
+_event_writer = BufferedLogWriter(EVENT_LOG, **_config)
+
+
+def flush_logs():
+    """
+    Write out all buffered log lines now.
+    """
+
+    _human_writer.flush()
+    _event_writer.flush()
+
+
+@atexit.register
+def _close_logs():
+    _human_writer.close()
+    _event_writer.close()
+
+
 def log_message(message: str):
     """
     Append a human-readable log message.
     """
     try:
-        with open(HUMAN_LOG, "a") as f:
-            f.write(f"[{_timestamp()}] {message}\n")
+        _human_writer.write(f"[{_timestamp()}] {message}\n")
     except Exception:
         # Logging must never crash pipeline
         pass
@@ -37,8 +196,7 @@ def log_event(event_type: str, payload: dict):
             "data": payload
         }
 
-        with open(EVENT_LOG, "a") as f:
-            f.write(json.dumps(event_record) + "\n")
+        _event_writer.write(json.dumps(event_record) + "\n")
 
     except Exception:
         pass
@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.logging.event_logger import LOG_DIR, EVENT_LOG, segment_paths, flush_logs
+
+
+INDEX_DIR = LOG_DIR / ".index"
+
+# Records per index block; a query reads only the blocks it needs
+BLOCK_RECORDS = 1000
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _log_files():
+    # Oldest first: rotated segments, then the active file
+    files = segment_paths(EVENT_LOG)
+    if EVENT_LOG.exists():
+        files.append(EVENT_LOG)
+    return files
+
+
+def _normalize_time(value):
+    """
+    Accept a datetime, "YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS".
+    Timestamps compare correctly as strings in this format.
+    """
+
+    if value is None or isinstance(value, str) and len(value) == 19:
+        return value
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    return datetime.strptime(value, "%Y-%m-%d").strftime(TIMESTAMP_FORMAT)
+
+
+# -----------------------------
+# Sidecar index
+# -----------------------------
+def _index_path(log_path):
+    return INDEX_DIR / f"{log_path.name}.idx.json"
+
+
+def _empty_index(stat):
+    return {"inode": stat.st_ino, "size": 0, "blocks": []}
+
+
+def _load_index(log_path):
+    """
+    Block index of a log file: byte range, time range and event counts
+    per BLOCK_RECORDS records. Extended in place when the file has grown,
+    rebuilt when it was replaced (e.g. the active file after rotation).
+    """
+
+    stat = log_path.stat()
+    path = _index_path(log_path)
+
+    index = None
+    if path.exists():
+        try:
+            with open(path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+
+    if index is None or index["inode"] != stat.st_ino or index["size"] > stat.st_size:
+        index = _empty_index(stat)
+
+    if index["size"] == stat.st_size:
+        return index
+
+    # A partial last block is re-scanned so it can fill up to BLOCK_RECORDS
+    if index["blocks"] and index["blocks"][-1]["records"] < BLOCK_RECORDS:
+        index["size"] = index["blocks"].pop()["offset"]
+
+    _extend_index(log_path, index)
+
+    INDEX_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, path)
+
+    return index
+
+
+def _extend_index(log_path, index):
+    block = None
+
+    with open(log_path, "rb") as f:
+        f.seek(index["size"])
+        offset = index["size"]
+
+        for line in f:
+            # Ignore a trailing line that is still being written
+            if not line.endswith(b"\n"):
+                break
+
+            if block is None:
+                block = {"offset": offset, "end": offset, "records": 0,
+                         "first_ts": None, "last_ts": None, "events": {}}
+
+            offset += len(line)
+            block["end"] = offset
+            block["records"] += 1
+
+            try:
+                record = json.loads(line)
+                ts, event = record["timestamp"], record["event"]
+            except (ValueError, KeyError, TypeError):
+                continue
+
+            block["first_ts"] = ts if block["first_ts"] is None else min(block["first_ts"], ts)
+            block["last_ts"] = ts if block["last_ts"] is None else max(block["last_ts"], ts)
+            block["events"][event] = block["events"].get(event, 0) + 1
+
+            if block["records"] >= BLOCK_RECORDS:
+                index["blocks"].append(block)
+                block = None
+
+    if block is not None:
+        index["blocks"].append(block)
+
+    index["size"] = index["blocks"][-1]["end"] if index["blocks"] else 0
+
+
+def _block_matches(block, start, end, events):
+    if block["first_ts"] is None:
+        return False
+    if start is not None and block["last_ts"] < start:
+        return False
+    if end is not None and block["first_ts"] >= end:
+        return False
+    if events is not None and not any(e in block["events"] for e in events):
+        return False
+    return True
+
+
+# -----------------------------
+# Reader
+# -----------------------------
+def iter_events(start=None, end=None, events=None):
+    """
+    Stream event records with start <= timestamp < end, optionally only
+    the given event types. Reads only the index blocks that can match.
+    Yields dicts in file order.
+    """
+
+    start, end = _normalize_time(start), _normalize_time(end)
+    events = {events} if isinstance(events, str) else set(events) if events else None
+
+    flush_logs()
+
+    for log_path in _log_files():
+        try:
+            index = _load_index(log_path)
+        except OSError:
+            continue
+
+        with open(log_path, "rb") as f:
+            for block in index["blocks"]:
+                if not _block_matches(block, start, end, events):
+                    continue
+
+                f.seek(block["offset"])
+                for line in f.read(block["end"] - block["offset"]).splitlines():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+
+                    if events is not None and record.get("event") not in events:
+                        continue
+                    ts = record.get("timestamp", "")
+                    if start is not None and ts < start:
+                        continue
+                    if end is not None and ts >= end:
+                        continue
+
+                    yield record
+
+
+def count_events(start=None, end=None):
+    """
+    Event counts by type. Blocks that fall entirely inside the time range
+    are answered from the index; only boundary blocks are read.
+    """
+
+    start, end = _normalize_time(start), _normalize_time(end)
+    counts = Counter()
+
+    flush_logs()
+
+    for log_path in _log_files():
+        index = _load_index(log_path)
+
+        with open(log_path, "rb") as f:
+            for block in index["blocks"]:
+                if not _block_matches(block, start, end, None):
+                    continue
+
+                if (start is None or block["first_ts"] >= start) and \
+                        (end is None or block["last_ts"] < end):
+                    counts.update(block["events"])
+                    continue
+
+                f.seek(block["offset"])
+                for line in f.read(block["end"] - block["offset"]).splitlines():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    ts = record.get("timestamp", "")
+                    if (start is None or ts >= start) and (end is None or ts < end):
+                        counts[record.get("event")] += 1
+
+    return dict(counts)
+
+
+# -----------------------------
+# Aggregations
+# -----------------------------
+def runs_per_day(start=None, end=None):
+    per_day = Counter(
+        record["timestamp"][:10]
+        for record in iter_events(start, end, events="PIPELINE_STARTED")
+    )
+    return dict(sorted(per_day.items()))
+
+
+def promotion_rate(start=None, end=None):
+    counts = Counter(
+        record["event"]
+        for record in iter_events(start, end, events={"MODEL_PROMOTED", "PROMOTION_REJECTED"})
+    )
+    decided = counts["MODEL_PROMOTED"] + counts["PROMOTION_REJECTED"]
+
+    return {
+        "promoted": counts["MODEL_PROMOTED"],
+        "rejected": counts["PROMOTION_REJECTED"],
+        "rate": counts["MODEL_PROMOTED"] / decided if decided else None
+    }
+
+
+def rmse_percentiles(start=None, end=None, percentiles=(50, 90, 95, 99), by_day=False):
+    """
+    RMSE percentiles from EVALUATION_COMPLETED events, overall or per day.
+    Only the RMSE values (one per run) are held in memory.
+    """
+
+    values = defaultdict(list)
+    for record in iter_events(start, end, events="EVALUATION_COMPLETED"):
+        rmse = (record.get("data") or {}).get("rmse")
+        if rmse is None:
+            continue
+        values[record["timestamp"][:10] if by_day else "all"].append(float(rmse))
+
+    result = {}
+    for key, rmses in sorted(values.items()):
+        result[key] = {
+            "count": len(rmses),
+            **{f"p{p}": float(v) for p, v in zip(percentiles, np.percentile(rmses, percentiles))}
+        }
+
+    return result if by_day else result.get("all", {"count": 0})
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Query logs/events.jsonl and its segments.")
+    parser.add_argument("--since", help="YYYY-MM-DD[ HH:MM:SS], inclusive")
+    parser.add_argument("--until", help="YYYY-MM-DD[ HH:MM:SS], exclusive")
+    parser.add_argument("--days", type=int, help="shorthand for --since N days ago")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    events = sub.add_parser("events", help="print matching records")
+    events.add_argument("--event", action="append", help="event type (repeatable)")
+    events.add_argument("--limit", type=int)
+
+    sub.add_parser("counts", help="records per event type")
+    sub.add_parser("runs-per-day", help="PIPELINE_STARTED per day")
+    sub.add_parser("promotion-rate", help="MODEL_PROMOTED vs PROMOTION_REJECTED")
+    rmse = sub.add_parser("rmse", help="RMSE percentiles")
+    rmse.add_argument("--by-day", action="store_true")
+
+    args = parser.parse_args()
+
+    start = args.since
+    if args.days is not None:
+        start = datetime.utcnow() - timedelta(days=args.days)
+
+    if args.command == "events":
+        for i, record in enumerate(iter_events(start, args.until, args.event)):
+            if args.limit is not None and i >= args.limit:
+                break
+            print(json.dumps(record))
+        return
+
+    if args.command == "counts":
+        result = count_events(start, args.until)
+    elif args.command == "runs-per-day":
+        result = runs_per_day(start, args.until)
+    elif args.command == "promotion-rate":
+        result = promotion_rate(start, args.until)
+    else:
+        result = rmse_percentiles(start, args.until, by_day=args.by_day)
+
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.validation.schema_compiler import compile_schema
+from src.logging.event_logger import log_message, log_event
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+MODELS_DIR = BASE_DIR / "models"
+PROMOTED_DIR = MODELS_DIR / "promoted"
+CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
+
+DEFAULT_BINS = 10
+
+# Floor for empty bins so PSI stays finite
+_EPSILON = 1e-4
+
+
+def sketch_path(version):
+    """
+    v3.ref -> promoted/v3_sketch.json
+    """
+
+    return PROMOTED_DIR / f"{Path(version).stem}_sketch.json"
+
+
+def _is_categorical(series):
+    return (
+        pd.api.types.is_bool_dtype(series.dtype)
+        or pd.api.types.is_object_dtype(series.dtype)
+        or isinstance(series.dtype, pd.CategoricalDtype)
+    )
+
+
+# -----------------------------
+# Sketches
+# -----------------------------
+def build_sketch(X: pd.DataFrame, bins=DEFAULT_BINS):
+    """
+    Reference sketch of training features: quantile-binned histograms for
+    numerical columns, frequency tables for categorical/boolean ones.
+    Returns JSON-serializable dict.
+    """
+
+    features = {}
+
+    for col in X.columns:
+        series = X[col]
+
+        if _is_categorical(series):
+            counts = series.astype(str).value_counts()
+            features[col] = {
+                "type": "categorical",
+                "counts": {str(k): int(v) for k, v in counts.items()}
+            }
+            continue
+
+        values = series.to_numpy(dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+
+        # Inner edges only; the outer bins are open-ended
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+
+        features[col] = {
+            "type": "numerical",
+            "edges": edges.tolist(),
+            "counts": counts.tolist()
+        }
+
+    return {"rows": len(X), "features": features}
+
+
+def save_sketch(sketch, path):
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(sketch, f)
+    os.replace(tmp_path, path)
+
+
+def load_sketch(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def psi(expected_counts, actual_counts):
+    """
+    Population stability index between two aligned count vectors.
+    """
+
+    expected = np.asarray(expected_counts, dtype=float)
+    actual = np.asarray(actual_counts, dtype=float)
+    if expected.sum() == 0 or actual.sum() == 0:
+        return 0.0
+
+    expected = np.maximum(expected / expected.sum(), _EPSILON)
+    actual = np.maximum(actual / actual.sum(), _EPSILON)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+class DriftMonitor:
+    """
+    Accumulate counts for incoming rows in the reference sketch's bins.
+    update() is O(rows) per chunk and keeps only the counts, so a streamed
+    backlog is never held in memory for the check.
+    """
+
+    def __init__(self, reference, version=None):
+        self.reference = reference
+        self.version = version
+        self.rows = 0
+
+        self._counts = {}
+        for col, spec in reference["features"].items():
+            if spec["type"] == "numerical":
+                self._counts[col] = np.zeros(len(spec["edges"]) + 1, dtype=np.int64)
+            else:
+                self._counts[col] = {}
+
+    @classmethod
+    def for_champion(cls):
+        """
+        Monitor against the current model's sketch.
+        Returns DriftMonitor or None when there is no champion or sketch.
+        """
+
+        if not CURRENT_MODEL_FILE.exists() or CURRENT_MODEL_FILE.stat().st_size == 0:
+            return None
+
+        version = CURRENT_MODEL_FILE.read_text().strip()
+        path = sketch_path(version)
+        if not path.exists():
+            return None
+
+        return cls(load_sketch(path), version=version)
+
+    def update(self, df: pd.DataFrame):
+        if df is None or df.empty:
+            return
+
+        # Same column types as the training frame the reference was built from
+        X, _ = compile_schema().transform(df)
+        self.update_features(X)
+
+    def update_features(self, X: pd.DataFrame):
+        """
+        Count rows that are already model inputs (e.g. from
+        validate_and_preprocess), skipping the transform.
+        """
+
+        if X is None or X.empty:
+            return
+
+        self.rows += len(X)
+
+        for col, spec in self.reference["features"].items():
+            if col not in X.columns:
+                continue
+
+            if spec["type"] == "numerical":
+                values = X[col].to_numpy(dtype=float)
+                values = values[~np.isnan(values)]
+                bins = np.searchsorted(np.asarray(spec["edges"]), values, side="right")
+                self._counts[col] += np.bincount(bins, minlength=len(self._counts[col]))
+            else:
+                counts = self._counts[col]
+                for key, value in X[col].astype(str).value_counts().items():
+                    counts[key] = counts.get(key, 0) + int(value)
+
+    def scores(self):
+        """
+        PSI per feature between the reference and the rows seen so far.
+        """
+
+        scores = {}
+        for col, spec in self.reference["features"].items():
+            if spec["type"] == "numerical":
+                scores[col] = psi(spec["counts"], self._counts[col])
+            else:
+                keys = sorted(set(spec["counts"]) | set(self._counts[col]))
+                scores[col] = psi(
+                    [spec["counts"].get(k, 0) for k in keys],
+                    [self._counts[col].get(k, 0) for k in keys]
+                )
+        return scores
+
+    def check(self, psi_threshold, min_rows=0):
+        """
+        Decide whether the incoming data has shifted enough to retrain.
+        Too few rows for a stable estimate count as drift.
+        Returns (drifted, max_psi).
+        """
+
+        scores = self.scores()
+        max_psi = max(scores.values()) if scores else 0.0
+        drifted = self.rows < min_rows or max_psi >= psi_threshold
+
+        log_message(
+            f"Drift check vs {self.version}: max PSI {max_psi:.4f} over {self.rows} rows "
+            f"({'retraining' if drifted else 'below threshold'})."
+        )
+        log_event("DRIFT_CHECKED", {
+            "reference_version": self.version,
+            "rows": self.rows,
+            "psi": scores,
+            "max_psi": max_psi,
+            "psi_threshold": psi_threshold,
+            "drifted": drifted
+        })
+
+        return drifted, max_psi
@@ -0,0 +1,165 @@
+import cProfile
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from src.logging.event_logger import log_message, log_event
+
+
+def _reset_peak_rss():
+    # Linux: writing 5 to clear_refs resets this process's VmHWM
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_bytes():
+    """
+    Peak resident set size since the last reset (VmHWM). Without /proc
+    this is ru_maxrss, the peak over the whole process so far.
+    Returns bytes.
+    """
+
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class StageSpan:
+    """
+    Measurements for one pipeline stage.
+    Set rows_in / rows_out inside the `with` block when known.
+    """
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.status = "ok"
+
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.peak_memory_bytes = None
+        self.peak_rss_bytes = None
+
+    def as_event(self):
+        return {
+            "stage": self.name,
+            "status": self.status,
+            "wall_seconds": self.wall_seconds,
+            "cpu_seconds": self.cpu_seconds,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out
+        }
+
+
+class StageRecorder:
+    """
+    Time pipeline stages and emit a STAGE_COMPLETED event for each.
+    CPU time and peak RSS cover this process only (not search or joblib
+    workers). Peak RSS is read from the kernel at no cost to the stage;
+    trace_memory adds Python allocations traced by tracemalloc, which
+    slows allocation-heavy stages.
+    With profile=True each stage also runs under cProfile; the profiles are
+    kept in memory until dump_profiles() writes them into a run folder.
+    """
+
+    def __init__(self, trace_memory=False, profile=False, peak_rss=True):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.peak_rss = peak_rss
+
+        # Folder of the run this invocation registered, once there is one
+        self.run_dir = None
+
+        self.spans = []
+        self._profiles = {}
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        span = StageSpan(name, rows_in)
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        if self.peak_rss:
+            _reset_peak_rss()
+
+        profiler = cProfile.Profile() if self.profile else None
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield span
+        except BaseException:
+            span.status = "error"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._profiles[name] = profiler
+
+            span.wall_seconds = round(time.perf_counter() - wall_start, 6)
+            span.cpu_seconds = round(time.process_time() - cpu_start, 6)
+
+            if self.peak_rss:
+                span.peak_rss_bytes = _peak_rss_bytes()
+
+            if self.trace_memory:
+                span.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self.spans.append(span)
+            log_event("STAGE_COMPLETED", span.as_event())
+
+    def dump_profiles(self, run_dir):
+        """
+        Write one <stage>.prof per profiled stage into run_dir/profiles.
+        Returns list of written paths.
+        """
+
+        if not self._profiles or run_dir is None:
+            return []
+
+        profile_dir = Path(run_dir) / "profiles"
+        profile_dir.mkdir(parents=True, exist_ok=True)
+
+        paths = []
+        for name, profiler in self._profiles.items():
+            path = profile_dir / f"{name}.prof"
+            profiler.dump_stats(path)
+            paths.append(path)
+
+        log_message(f"Stage profiles written to {profile_dir}")
+        log_event("PROFILES_WRITTEN", {
+            "run": Path(run_dir).name,
+            "stages": list(self._profiles)
+        })
+
+        return paths
+
+    def summary(self):
+        return [span.as_event() for span in self.spans]
@@ -1,64 +1,335 @@
+import time
 import yaml
 from pathlib import Path
+import pandas as pd
 
-from src.ingestion.pull_batch import pull_batch
-from src.validation.sanity_check import validate_df
-from src.preprocessing.transform import preprocess
+from src.ingestion.pull_batch import pull_batch, iter_batches, iter_leased_batches
+from src.validation.sanity_check import validate_df, quarantine_invalid_rows
+from src.preprocessing.transform import preprocess, validate_and_preprocess
 from src.training.train import train_model
 from src.training.evaluate import evaluate_model
+from src.training.fingerprint import compute_fingerprint, compute_store_fingerprint, find_cached_run
 from src.registry.versioning import register_experiment
 from src.registry.promotion import promote_model
+from src.registry.retention import run_retention
+from src.registry.catalog import last_trained_at, record_trained
 from src.logging.event_logger import log_message, log_event
 from src.ingestion.init_db import init_database
+from src.storage.columnar_store import append_batch, read_history, start_compaction
+from src.orchestration.instrumentation import StageRecorder
+from src.monitoring.drift import DriftMonitor, build_sketch
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 CONFIG_DIR = BASE_DIR / "config"
+# Profiles of invocations that registered no run; not committed
+PROFILES_DIR = BASE_DIR / "data" / "profiles"
+
+
+def _load_pipeline_config():
+    with open(CONFIG_DIR / "pipeline.yaml", "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _load_training_config():
+    with open(CONFIG_DIR / "training.yaml", "r") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _validate(df, validation_config):
+    """
+    Strict mode rejects the whole frame on the first bad row; quarantine
+    mode sets bad rows aside and keeps the rest.
+    Returns DataFrame of rows to keep (None or empty if nothing is usable).
+    """
+
+    if validation_config.get("mode", "strict") == "quarantine":
+        return quarantine_invalid_rows(df, chunk_rows=validation_config.get("chunk_rows"))
+
+    return df if validate_df(df) else None
+
+
+def _ingest_stream(use_store, validation_config, drift=None, batches=None):
+    """
+    Drain the backlog chunk by chunk (iter_batches unless another chunk
+    source is given), validating each chunk as it arrives.
+    Memory stays bounded by the chunk size only with the training store
+    enabled: chunks are appended to it. Without the store every chunk is
+    kept and concatenated, so the whole backlog is held in memory.
+    Drift counts are updated per chunk.
+    Returns (rows_ingested, DataFrame or None).
+    """
+
+    rows = 0
+    frames = []
+    batches = batches if batches is not None else iter_batches()
+
+    # Closed explicitly so a chunk that fails here is handed back at once
+    # (watermark rolled back / lease released), not whenever it is collected
+    try:
+        for chunk in batches:
+            chunk = _validate(chunk, validation_config)
+            if chunk is None:
+                break
+            if chunk.empty:
+                # Every row of this chunk was quarantined; keep draining
+                continue
+
+            rows += len(chunk)
+            if drift is not None:
+                drift.update(chunk)
+            if use_store:
+                append_batch(chunk)
+            else:
+                frames.append(chunk)
+    finally:
+        batches.close()
+
+    df = pd.concat(frames, ignore_index=True) if frames else None
+    return rows, df
+
+
+def _train_and_register(X, y, recorder, fingerprint=None, load_full=None):
+    """
+    Fit, evaluate and register a model on (X, y).
+    Returns (run_path, metrics) or None if a step produced nothing.
+    """
+
+    # Step 4: Training
+    with recorder.stage("training", rows_in=len(X)) as span:
+        def _load_full():
+            X_full, y_full = load_full()
+            span.rows_in = len(X_full)
+            return X_full, y_full
+
+        model, X_test, y_test = train_model(X, y, load_full=_load_full if load_full else None)
+        span.rows_out = None if X_test is None else span.rows_in - len(X_test)
+
+    if model is None:
+        log_message("Pipeline exiting: Training skipped.")
+        return None
+
+    # Step 5: Evaluation
+    with recorder.stage("evaluation", rows_in=len(X_test)) as span:
+        metrics = evaluate_model(model, X_test, y_test)
+        span.rows_out = len(X_test) if metrics else 0
+
+    if not metrics:
+        log_message("Pipeline exiting: Evaluation skipped.")
+        return None
+
+    # Step 6: Register Experiment
+    with recorder.stage("registration"):
+        run_path = register_experiment(model, metrics, fingerprint=fingerprint)
+
+    return run_path, metrics
+
+
+def _write_report(recorder, run_started_at, status):
+    """
+    Emit the per-stage report and write any profiles. Called on every exit
+    (complete, early or failed), so a failing stage is measured too.
+    """
+
+    log_event("PIPELINE_REPORT", {"status": status, "stages": recorder.summary()})
+
+    # Profiles go next to the run they describe. Invocations that
+    # registered no run (early exits, failures, cache hits) get their own.
+    if recorder.run_dir is not None:
+        recorder.dump_profiles(recorder.run_dir)
+    else:
+        started = time.strftime("%Y%m%d_%H%M%S", time.gmtime(run_started_at))
+        recorder.dump_profiles(PROFILES_DIR / f"pipeline_{started}")
 
 
 def main():
 
     log_message("Retraining pipeline started.")
     log_event("PIPELINE_STARTED", {})
+    run_started_at = int(time.time())
 
     # Step 0: Ensure DB schema exists
     init_database()
 
-    # Step 1: Ingestion (Postgres → DataFrame)
-    df = pull_batch()
-    if df is None or df.empty:
-        log_message("Pipeline exiting: No new data.")
-        return
+    pipeline_config = _load_pipeline_config()
+    instrumentation_config = pipeline_config.get("instrumentation", {})
+    recorder = StageRecorder(
+        trace_memory=instrumentation_config.get("trace_memory", False),
+        profile=instrumentation_config.get("profile", False),
+        peak_rss=instrumentation_config.get("peak_rss", True)
+    )
 
-    # Step 2: Validation
-    valid = validate_df(df)
-    if not valid:
-        log_message("Pipeline exiting: Validation failed.")
-        return
+    status = "error"
+    try:
+        _run(pipeline_config, recorder)
+        status = "ok"
+    finally:
+        _write_report(recorder, run_started_at, status)
 
-    # Step 3: Preprocessing
-    X, y = preprocess(df)
-    if X is None or len(X) == 0:
+
+def _run(pipeline_config, recorder):
+    """
+    Steps 1-8 of the pipeline; returns early when a step leaves nothing
+    to do. The registered run folder, if any, is kept on recorder.run_dir.
+    """
+
+    ingestion_mode = pipeline_config.get("ingestion", {}).get("mode", "batch")
+    store_config = pipeline_config.get("store", {})
+    use_store = store_config.get("enabled", False)
+    validation_config = pipeline_config.get("validation", {})
+    drift_config = pipeline_config.get("drift", {})
+
+    # Reference distribution of the current model (None: always train)
+    drift = DriftMonitor.for_champion() if drift_config.get("enabled", False) else None
+
+    # Step 1 + 2: Ingestion (Postgres → DataFrame) and Validation
+    X = y = None
+    if ingestion_mode in ("stream", "lease"):
+        if not use_store:
+            log_message(
+                f"Ingestion mode '{ingestion_mode}' without the store holds the whole backlog in memory."
+            )
+
+        # Leases let overlapping runs ingest disjoint id ranges
+        batches = iter_leased_batches() if ingestion_mode == "lease" else None
+
+        with recorder.stage("ingestion") as span:
+            rows, df = _ingest_stream(use_store, validation_config, drift, batches)
+            span.rows_out = rows
+
+        if rows == 0:
+            log_message("Pipeline exiting: No new data.")
+            return
+
+    else:
+        with recorder.stage("ingestion") as span:
+            df = pull_batch()
+            span.rows_out = 0 if df is None else len(df)
+
+        if df is None or df.empty:
+            log_message("Pipeline exiting: No new data.")
+            return
+
+        # Without the store the validated frame goes straight to training,
+        # so strict validation and preprocessing share one scan
+        fused = not use_store and validation_config.get("mode", "strict") == "strict"
+
+        with recorder.stage("validation", rows_in=len(df)) as span:
+            if fused:
+                X, y = validate_and_preprocess(df)
+                span.rows_out = len(X)
+            else:
+                df = _validate(df, validation_config)
+                span.rows_out = 0 if df is None else len(df)
+
+        if df is None or df.empty:
+            log_message("Pipeline exiting: Validation failed.")
+            return
+
+        if drift is not None:
+            if fused:
+                drift.update_features(X)
+            else:
+                drift.update(df)
+
+        if use_store:
+            with recorder.stage("store_append", rows_in=len(df)):
+                append_batch(df)
+
+    # Step 2a: Drift gate (new rows stay in the store for later runs)
+    if drift is not None:
+        with recorder.stage("drift", rows_in=drift.rows):
+            drifted, max_psi = drift.check(
+                drift_config.get("psi_threshold", 0.1),
+                min_rows=drift_config.get("min_rows", 0)
+            )
+
+        if not drifted:
+            log_message("Pipeline exiting: No significant drift.")
+            log_event("TRAINING_SKIPPED", {"reason": "no_drift", "max_psi": max_psi})
+            return
+
+    # Step 2b: Training data from the local store
+    # (incremental training only needs the rows ingested since the last
+    # successful training, including those of runs the drift gate stopped)
+    training_config = _load_training_config()
+    cache_enabled = training_config.get("cache", {}).get("enabled", False)
+    incremental = training_config.get("training", {}).get("mode", "full") == "incremental"
+    window_hours = store_config.get("window_hours")
+    fingerprint = None
+    cached = None
+
+    load_full = None
+    read_started_at = since = None
+    if use_store:
+        since = last_trained_at() if incremental else None
+        read_started_at = int(time.time())
+
+        if incremental:
+            # Full history, in case the champion cannot be grown
+            def load_full():
+                return preprocess(read_history(window_hours=window_hours))
+
+        # Step 2c: Reuse a run trained on the same store rows and config,
+        # identified from the manifest before anything is read
+        if cache_enabled:
+            with recorder.stage("fingerprint"):
+                fingerprint = compute_store_fingerprint(window_hours, since, incremental=incremental)
+                cached = find_cached_run(fingerprint)
+
+        if cached is None:
+            with recorder.stage("store_read") as span:
+                df = read_history(window_hours=window_hours, since=since)
+                span.rows_out = 0 if df is None else len(df)
+
+        start_compaction(**store_config.get("compaction", {}))
+
+    # Step 3: Preprocessing (already done if validation was fused with it)
+    if X is None and cached is None:
+        with recorder.stage("preprocessing", rows_in=0 if df is None else len(df)) as span:
+            X, y = preprocess(df)
+            span.rows_out = 0 if X is None else len(X)
+
+    if cached is None and (X is None or len(X) == 0):
         log_message("Pipeline exiting: No data after preprocessing.")
         return
 
-    # Step 4: Training
-    model, X_test, y_test = train_model(X, y)
-    if model is None:
-        log_message("Pipeline exiting: Training skipped.")
-        return
+    # Step 3b: Reuse a run already trained on identical data and config
+    if cache_enabled and fingerprint is None:
+        with recorder.stage("fingerprint", rows_in=len(X)):
+            fingerprint = compute_fingerprint(X, y, incremental=incremental)
+            cached = find_cached_run(fingerprint)
 
-    # Step 5: Evaluation
-    metrics = evaluate_model(model, X_test, y_test)
-    if not metrics:
-        log_message("Pipeline exiting: Evaluation skipped.")
+    # Steps 4-6: Training, Evaluation, Registration
+    result = cached if cached is not None else _train_and_register(X, y, recorder, fingerprint, load_full)
+    if result is None:
         return
 
-    # Step 6: Register Experiment
-    run_path = register_experiment(model, metrics)
+    run_path, metrics = result
+    if cached is None:
+        recorder.run_dir = run_path
+
+    # Watermark for the next incremental read
+    if read_started_at is not None:
+        record_trained(read_started_at)
+
+    # Step 7: Promotion (with the training distribution as drift reference;
+    # a store cache hit has not read it, so it is read only if promoted)
+    def training_sketch():
+        features = X if X is not None else preprocess(read_history(window_hours=window_hours, since=since))[0]
+        return build_sketch(features)
+
+    with recorder.stage("promotion"):
+        sketch = training_sketch if drift_config.get("enabled", False) else None
+        promoted = promote_model(run_path, metrics, sketch=sketch)
 
-    # Step 7: Promotion
-    promoted = promote_model(run_path, metrics)
+    # Step 8: Retention (a failed cleanup must not fail a finished run)
+    try:
+        with recorder.stage("retention"):
+            run_retention()
+    except Exception as e:
+        log_message(f"Retention failed: {e}")
+        log_event("RETENTION_FAILED", {"error": str(e)})
 
     log_message("Retraining pipeline completed.")
     log_event("PIPELINE_COMPLETED", {"promoted": promoted})
@@ -0,0 +1,158 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+
+# Code for missing values and values outside the fitted vocabulary
+UNSEEN_CODE = -1
+
+
+def _is_categorical(series):
+    return (
+        isinstance(series.dtype, pd.CategoricalDtype)
+        or pd.api.types.is_object_dtype(series.dtype)
+        or pd.api.types.is_string_dtype(series.dtype)
+    )
+
+
+def _code_dtype(n_categories):
+    # Smallest signed type that still leaves room for UNSEEN_CODE
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class CategoricalEncoder:
+    """
+    Map categorical columns to compact integer codes.
+    The vocabulary is fixed at fit time (sorted, so codes are stable across
+    runs on the same data); missing and unseen values become UNSEEN_CODE.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+
+    @property
+    def columns(self):
+        return list(self.vocabulary)
+
+    def fit(self, X: pd.DataFrame, columns=None):
+        """
+        Learn the vocabulary of the given columns (default: every
+        string/object/category column).
+        Returns self.
+        """
+
+        if columns is None:
+            columns = [col for col in X.columns if _is_categorical(X[col])]
+
+        self.vocabulary = {
+            col: sorted(str(v) for v in pd.unique(X[col].dropna()))
+            for col in columns
+        }
+        return self
+
+    def transform(self, X: pd.DataFrame):
+        """
+        Replace encoded columns with their codes; other columns are passed
+        through untouched.
+        Returns DataFrame with the same column order.
+        """
+
+        columns = {}
+        for col in X.columns:
+            vocabulary = self.vocabulary.get(col)
+            if vocabulary is None:
+                columns[col] = X[col]
+                continue
+
+            codes = pd.Categorical(X[col], categories=vocabulary).codes
+            columns[col] = codes.astype(_code_dtype(len(vocabulary)), copy=False)
+
+        return pd.DataFrame(columns, index=X.index)
+
+    def encode_record(self, record: dict):
+        """
+        Encode a single row (e.g. one API request) with dict lookups,
+        without building a frame.
+        Returns a new dict; non-encoded fields are passed through.
+        """
+
+        # Built on first use: encoders pickled before this method existed
+        # only carry the vocabulary
+        codes = getattr(self, "_codes", None)
+        if codes is None:
+            codes = self._codes = {
+                col: {value: code for code, value in enumerate(vocabulary)}
+                for col, vocabulary in self.vocabulary.items()
+            }
+
+        encoded = dict(record)
+        for col, lookup in codes.items():
+            if col in encoded:
+                value = encoded[col]
+                encoded[col] = lookup.get(value, UNSEEN_CODE) if isinstance(value, str) else UNSEEN_CODE
+        return encoded
+
+
+class EncodedModel:
+    """
+    Fitted model bundled with the encoder its inputs went through, so the
+    artifact scores raw feature frames. Saved and loaded as one object.
+    """
+
+    def __init__(self, encoder: CategoricalEncoder, model):
+        self.encoder = encoder
+        self.model = model
+
+    @property
+    def feature_names_in_(self):
+        # Codes keep the column names, so these are the raw feature names
+        return self.model.feature_names_in_
+
+    def predict(self, X):
+        return self.model.predict(self.encoder.transform(X))
+
+
+def save_encoder(encoder, path):
+    """
+    Write the encoder's vocabulary as JSON (empty for no encoder), so it
+    can be rebuilt without unpickling the model it was bundled with.
+    """
+
+    with open(path, "w") as f:
+        json.dump({"vocabulary": encoder.vocabulary if encoder is not None else {}}, f)
+
+
+def load_encoder(path):
+    """
+    Returns CategoricalEncoder rebuilt from save_encoder output.
+    """
+
+    encoder = CategoricalEncoder()
+    with open(path, "r") as f:
+        encoder.vocabulary = json.load(f)["vocabulary"]
+    return encoder
+
+
+def wrap(encoder, model):
+    """
+    Returns model bundled with encoder, or model itself when there is
+    nothing to encode.
+    """
+
+    if encoder is None or not encoder.columns:
+        return model
+    return EncodedModel(encoder, model)
+
+
+def unwrap(model):
+    """
+    Returns (encoder or None, underlying model).
+    """
+
+    if isinstance(model, EncodedModel):
+        return model.encoder, model.model
+    return None, model
@@ -1,15 +1,10 @@
-import yaml
-from pathlib import Path
 import pandas as pd
 
+from src.validation.schema_compiler import compile_schema
+from src.validation.sanity_check import raise_for_report
 from src.logging.event_logger import log_message, log_event
 
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-CONFIG_DIR = BASE_DIR / "config"
-SCHEMA_PATH = CONFIG_DIR / "schema.yaml"
-
-
 def preprocess(df: pd.DataFrame):
     """
     Preprocess customer_7day_summary dataset for model ingestion.
@@ -25,73 +20,83 @@ def preprocess(df: pd.DataFrame):
         log_event("PREPROCESS_SKIPPED", {"reason": "empty_dataframe"})
         return pd.DataFrame(), pd.Series(dtype=float)
 
-    # -----------------------------
-    # Load schema
-    # -----------------------------
-    with open(SCHEMA_PATH, "r") as f:
-        schema = yaml.safe_load(f)
-
-    numerical_features = schema["numerical_features"]
-    categorical_features = schema["categorical_features"]
-    target = schema["target"]
-
-    features = numerical_features + categorical_features
-    required_columns = features + [target]
-
-    # -----------------------------
-    # Drop non-schema columns
-    # -----------------------------
-    df = df[ [c for c in df.columns if c in required_columns] ].copy()
+    plan = compile_schema()
 
     # -----------------------------
     # Schema validation
     # -----------------------------
-    missing_columns = set(required_columns) - set(df.columns)
+    missing_columns = plan.missing_columns(df)
     if missing_columns:
         raise Exception(f"Preprocessing error: Missing columns {missing_columns}")
 
     # -----------------------------
-    # Split X and y
+    # Split X and y, normalizing types; constraints are checked on the
+    # converted columns in the same pass (columns already in the right
+    # dtype are not copied)
     # -----------------------------
-    X = df[features].copy()
-    y = df[target].astype(float)
+    report, X, y = plan.scan(df)
+
+    violations = report["min_violations"]
+    if violations:
+        col = violations[0]
+        raise Exception(
+            f"Constraint violation: {col} has values < {plan.min_constraints[col]}"
+        )
 
     # -----------------------------
-    # Type normalization
+    # Logging
     # -----------------------------
-    for col in numerical_features:
-        if col in X.columns:
-            X[col] = pd.to_numeric(X[col], errors="coerce")
+    log_message(f"Preprocessing completed. Rows processed: {len(df)}")
+    log_event(
+        "PREPROCESS_COMPLETED",
+        {
+            "rows_processed": len(df),
+            "features_used": plan.features,
+            "target": plan.target,
+            "grain": "one_row_per_customer"
+        }
+    )
 
-    for col in categorical_features:
-        if col in X.columns:
-            X[col] = X[col].astype(str)
+    return X, y
 
-    # Boolean normalization
-    if "discount_applied" in X.columns:
-        X["discount_applied"] = X["discount_applied"].astype(bool)
 
-    # -----------------------------
-    # Constraint enforcement
-    # -----------------------------
-    constraints = schema.get("constraints", {})
-    for col, rule in constraints.items():
-        if col in X.columns and "min" in rule:
-            if (X[col] < rule["min"]).any():
-                raise Exception(
-                    f"Constraint violation: {col} has values < {rule['min']}"
-                )
+def validate_and_preprocess(df: pd.DataFrame):
+    """
+    Strict validation and preprocessing fused: one scan of the frame both
+    checks every schema rule and builds the typed model inputs.
+    Same failures and events as validate_df followed by preprocess.
+    Returns (X, y); both empty when df is empty.
+    """
+
+    if df is None or df.empty:
+        log_message("Validation skipped: DataFrame is empty.")
+        log_event("VALIDATION_SKIPPED", {"reason": "empty_dataframe"})
+        return pd.DataFrame(), pd.Series(dtype=float)
+
+    plan = compile_schema()
+
+    missing_columns = plan.missing_columns(df)
+    if missing_columns:
+        log_message(f"Validation failed: Missing columns {missing_columns}")
+        log_event(
+            "VALIDATION_FAILED",
+            {"reason": "missing_columns", "columns": list(missing_columns)}
+        )
+        raise Exception(f"Missing columns: {missing_columns}")
+
+    report, X, y = plan.scan(df)
+    raise_for_report(plan, report)
+
+    log_message("Validation passed successfully.")
+    log_event("VALIDATION_PASSED", {"rows_validated": len(df)})
 
-    # -----------------------------
-    # Logging
-    # -----------------------------
     log_message(f"Preprocessing completed. Rows processed: {len(df)}")
     log_event(
         "PREPROCESS_COMPLETED",
         {
             "rows_processed": len(df),
-            "features_used": features,
-            "target": target,
+            "features_used": plan.features,
+            "target": plan.target,
             "grain": "one_row_per_customer"
         }
     )
@@ -0,0 +1,23 @@
+import joblib
+
+
+def save_model(model, path):
+    """
+    Write a model artifact that can be opened with mmap_mode.
+    Uncompressed, so numpy arrays are stored as raw, page-aligned buffers.
+    """
+
+    joblib.dump(model, path, compress=0)
+
+
+def load_model(path, mmap=True):
+    """
+    Load a model artifact.
+    With mmap=True, numpy arrays are mapped read-only from the file, so
+    processes loading the same artifact share page-cache memory. Note that
+    sklearn tree nodes are copied out of the mapping on unpickle; forests
+    only share memory through their flattened arrays.
+    Use mmap=False for models that will be updated in place.
+    """
+
+    return joblib.load(path, mmap_mode="r" if mmap else None)
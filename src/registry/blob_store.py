@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+
+from src.registry.artifacts import save_model
+from src.logging.event_logger import log_message, log_event
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+MODELS_DIR = BASE_DIR / "models"
+BLOBS_DIR = MODELS_DIR / "blobs"
+
+REF_SUFFIX = ".ref"
+_CHUNK_BYTES = 1024 * 1024
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(digest):
+    return BLOBS_DIR / digest[:2] / f"{digest}.pkl"
+
+
+def flat_dir(digest):
+    # Flattened forest arrays are derived from the blob, so they share its key
+    return BLOBS_DIR / digest[:2] / f"{digest}_flat"
+
+
+def _store_tmp(tmp_path):
+    """
+    Move a freshly written file into the store under its content hash.
+    Returns (digest, created).
+    """
+
+    digest = _hash_file(tmp_path)
+    dest = blob_path(digest)
+
+    if dest.exists():
+        tmp_path.unlink()
+        return digest, False
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, dest)
+    return digest, True
+
+
+def put_model(model):
+    """
+    Serialize a model into the blob store.
+    Returns the sha256 digest; byte-identical models share one blob.
+    """
+
+    BLOBS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = BLOBS_DIR / f".tmp-{uuid.uuid4().hex}.pkl"
+    save_model(model, tmp_path)
+
+    digest, created = _store_tmp(tmp_path)
+    log_event("BLOB_STORED", {"digest": digest, "deduplicated": not created})
+    return digest
+
+
+def put_file(path):
+    """
+    Copy an existing artifact into the blob store.
+    Returns the sha256 digest.
+    """
+
+    BLOBS_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = BLOBS_DIR / f".tmp-{uuid.uuid4().hex}.pkl"
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        for chunk in iter(lambda: src.read(_CHUNK_BYTES), b""):
+            dst.write(chunk)
+
+    digest, _ = _store_tmp(tmp_path)
+    return digest
+
+
+# -----------------------------
+# References
+# -----------------------------
+def write_ref(ref_path, digest, **meta):
+    """
+    Point ref_path at a blob. Extra keyword fields (e.g. promoted_at) are
+    stored alongside, so the catalog can be rebuilt from the refs alone.
+    """
+
+    ref_path = Path(ref_path)
+    tmp_path = ref_path.with_name(f".{ref_path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"blob": digest, **meta}, f)
+    os.replace(tmp_path, ref_path)
+
+
+def read_ref(ref_path):
+    return read_ref_meta(ref_path)["blob"]
+
+
+def read_ref_meta(ref_path):
+    """
+    Returns the whole ref as a dict ({"blob": digest, ...}).
+    """
+
+    with open(ref_path, "r") as f:
+        return json.load(f)
+
+
+def resolve(path):
+    """
+    Map an artifact path to the file holding the model.
+    .ref files point into the blob store; legacy .pkl paths are returned as-is.
+    """
+
+    path = Path(path)
+    if path.suffix == REF_SUFFIX:
+        return blob_path(read_ref(path))
+    return path
+
+
+def digest_of(path):
+    """
+    Content digest of an artifact, whether it is a .ref or a legacy file.
+    """
+
+    path = Path(path)
+    if path.suffix == REF_SUFFIX:
+        return read_ref(path)
+    return _hash_file(path)
+
+
+# -----------------------------
+# Migration of legacy full copies
+# -----------------------------
+def migrate_legacy_artifacts():
+    """
+    Replace experiments' model.pkl and promoted vN.pkl copies with refs.
+    Returns number of artifacts migrated.
+    """
+
+    migrated = 0
+
+    for model_path in sorted(MODELS_DIR.glob("experiments/run_*/model.pkl")):
+        write_ref(model_path.with_suffix(REF_SUFFIX), put_file(model_path))
+        model_path.unlink()
+        migrated += 1
+
+    current_file = MODELS_DIR / "current_model.txt"
+    current = current_file.read_text().strip() if current_file.exists() else ""
+
+    for model_path in sorted(MODELS_DIR.glob("promoted/v*.pkl")):
+        digest = put_file(model_path)
+        write_ref(model_path.with_suffix(REF_SUFFIX), digest)
+        model_path.unlink()
+        migrated += 1
+
+        legacy_flat = model_path.with_name(f"{model_path.stem}_flat")
+        if legacy_flat.exists() and not flat_dir(digest).exists():
+            os.replace(legacy_flat, flat_dir(digest))
+
+        if current == model_path.name:
+            current_file.write_text(model_path.with_suffix(REF_SUFFIX).name)
+
+    log_message(f"Migrated {migrated} legacy artifacts into the blob store.")
+    log_event("BLOBS_MIGRATED", {"artifacts": migrated})
+
+    return migrated
+
+
+if __name__ == "__main__":
+    print(f"Migrated {migrate_legacy_artifacts()} artifacts.")
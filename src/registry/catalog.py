@@ -0,0 +1,469 @@
+import argparse
+import json
+import re
+import sqlite3
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+MODELS_DIR = BASE_DIR / "models"
+CATALOG_PATH = MODELS_DIR / "registry.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    blob TEXT,
+    rmse REAL,
+    metrics TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_rmse ON runs (rmse);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs (created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_blob ON runs (blob);
+
+CREATE TABLE IF NOT EXISTS versions (
+    version INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    run_id TEXT,
+    blob TEXT,
+    rmse REAL,
+    parent_version INTEGER,
+    promoted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_versions_blob ON versions (blob);
+CREATE INDEX IF NOT EXISTS idx_versions_promoted_at ON versions (promoted_at);
+
+CREATE TABLE IF NOT EXISTS champion (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS fingerprints (
+    fingerprint TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fingerprints_run ON fingerprints (run_id);
+
+CREATE TABLE IF NOT EXISTS blob_gc (
+    digest TEXT PRIMARY KEY,
+    unreferenced_since TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _timestamp():
+    return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _committed_at(path):
+    """
+    When path was last committed (UTC), for refs that predate the
+    promoted_at field. A fresh checkout resets every mtime, so the file
+    time is only the last resort.
+    Returns "YYYY-mm-dd HH:MM:SS".
+    """
+
+    try:
+        seconds = subprocess.run(
+            ["git", "log", "-1", "--format=%ct", "--", str(path)],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        seconds = ""
+
+    if not seconds:
+        seconds = path.stat().st_mtime
+    return datetime.utcfromtimestamp(int(float(seconds))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _connect():
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Autocommit mode; transactions are opened explicitly below
+    conn = sqlite3.connect(CATALOG_PATH, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    _bootstrap(conn)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """
+    Exclusive write transaction (BEGIN IMMEDIATE).
+    Concurrent promotions queue on this lock instead of racing on versions.
+    """
+
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+@contextmanager
+def _reader(conn=None):
+    if conn is not None:
+        yield conn
+        return
+
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+# -----------------------------
+# Backfill from the directory layout
+# -----------------------------
+def _bootstrap(conn):
+    """
+    One-time import of run_* folders and promoted versions that predate
+    the catalog. The catalog is not committed: CI restores it from the
+    Actions cache, and a checkout without one rebuilds it from these files.
+    """
+
+    done = conn.execute(
+        "SELECT value FROM catalog_meta WHERE key='bootstrapped'"
+    ).fetchone()
+    if done is not None:
+        return
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Another process may have finished while we waited for the lock
+        if conn.execute(
+            "SELECT value FROM catalog_meta WHERE key='bootstrapped'"
+        ).fetchone() is None:
+            _import_directories(conn)
+            conn.execute(
+                "INSERT INTO catalog_meta (key, value) VALUES ('bootstrapped', ?)",
+                (_timestamp(),)
+            )
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _import_directories(conn):
+    from src.registry.blob_store import digest_of, read_ref_meta, REF_SUFFIX
+    from src.registry.versioning import FINGERPRINT_FILE
+
+    for metrics_path in sorted((MODELS_DIR / "experiments").glob("run_*/metrics.json")):
+        run_dir = metrics_path.parent
+        with open(metrics_path, "r") as f:
+            metrics = json.load(f)
+
+        artifact = run_dir / f"model{REF_SUFFIX}"
+        if not artifact.exists():
+            artifact = run_dir / "model.pkl"
+
+        # run_YYYYmmdd_HHMMSS, optionally followed by _<microseconds>_<random>
+        created_at = datetime.strptime(run_dir.name[:len("run_YYYYmmdd_HHMMSS")], "run_%Y%m%d_%H%M%S")
+        record_run(
+            run_dir.name,
+            metrics,
+            blob=digest_of(artifact) if artifact.exists() else None,
+            created_at=created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            conn=conn
+        )
+
+        fingerprint_path = run_dir / FINGERPRINT_FILE
+        if fingerprint_path.exists():
+            record_fingerprint(fingerprint_path.read_text().strip(), run_dir.name, conn=conn)
+
+    promoted_dir = MODELS_DIR / "promoted"
+    artifacts = {}
+    for path in list(promoted_dir.glob("v*.pkl")) + list(promoted_dir.glob(f"v*{REF_SUFFIX}")):
+        if re.fullmatch(r"v\d+", path.stem):
+            artifacts[int(path.stem[1:])] = path
+
+    parent = None
+    for number in sorted(artifacts):
+        path = artifacts[number]
+        metrics_path = promoted_dir / f"{path.stem}_metrics.json"
+        rmse = None
+        if metrics_path.exists():
+            with open(metrics_path, "r") as f:
+                rmse = json.load(f).get("rmse")
+
+        # Newer refs carry their run and promotion time; for older ones the
+        # run is matched by blob and the time taken from git
+        meta = read_ref_meta(path) if path.suffix == REF_SUFFIX else {}
+        digest = meta.get("blob") or digest_of(path)
+        run_id = meta.get("run_id")
+        if run_id is None:
+            row = conn.execute(
+                "SELECT run_id FROM runs WHERE blob=? ORDER BY created_at LIMIT 1", (digest,)
+            ).fetchone()
+            run_id = row["run_id"] if row is not None else None
+
+        add_version(
+            conn, number, path.name, run_id, digest, rmse, parent,
+            promoted_at=meta.get("promoted_at") or _committed_at(path)
+        )
+        parent = number
+
+    current_file = MODELS_DIR / "current_model.txt"
+    if current_file.exists() and current_file.stat().st_size > 0:
+        current = current_file.read_text().strip()
+        row = conn.execute("SELECT version FROM versions WHERE name=?", (current,)).fetchone()
+        if row is not None:
+            set_champion(conn, row["version"])
+
+
+# -----------------------------
+# Writes
+# -----------------------------
+def record_run(run_id, metrics, blob=None, created_at=None, conn=None):
+    sql = """
+        INSERT INTO runs (run_id, created_at, blob, rmse, metrics)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    params = (run_id, created_at or _timestamp(), blob, metrics.get("rmse"), json.dumps(metrics))
+
+    if conn is not None:
+        conn.execute(sql, params)
+        return
+
+    with transaction() as conn:
+        conn.execute(sql, params)
+
+
+def record_fingerprint(fingerprint, run_id, conn=None):
+    sql = """
+        INSERT OR REPLACE INTO fingerprints (fingerprint, run_id, created_at)
+        VALUES (?, ?, ?)
+    """
+    params = (fingerprint, run_id, _timestamp())
+
+    if conn is not None:
+        conn.execute(sql, params)
+        return
+
+    with transaction() as conn:
+        conn.execute(sql, params)
+
+
+def forget_fingerprint(fingerprint):
+    with transaction() as conn:
+        conn.execute("DELETE FROM fingerprints WHERE fingerprint=?", (fingerprint,))
+
+
+def last_trained_at(conn=None):
+    """
+    Store ingestion time (epoch seconds) that the last successful training
+    read up to, or None if nothing has been trained from the store yet.
+    """
+
+    with _reader(conn) as c:
+        row = c.execute(
+            "SELECT value FROM catalog_meta WHERE key='last_trained_at'"
+        ).fetchone()
+        return int(row["value"]) if row is not None else None
+
+
+def record_trained(ingested_through, conn=None):
+    sql = "INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('last_trained_at', ?)"
+    params = (str(int(ingested_through)),)
+
+    if conn is not None:
+        conn.execute(sql, params)
+        return
+
+    with transaction() as conn:
+        conn.execute(sql, params)
+
+
+def next_version(conn):
+    row = conn.execute("SELECT MAX(version) AS v FROM versions").fetchone()
+    return (row["v"] or 0) + 1
+
+
+def add_version(conn, version, name, run_id, blob, rmse, parent_version, promoted_at=None):
+    conn.execute(
+        """
+        INSERT INTO versions (version, name, run_id, blob, rmse, parent_version, promoted_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """,
+        (version, name, run_id, blob, rmse, parent_version, promoted_at or _timestamp())
+    )
+
+
+def set_champion(conn, version):
+    conn.execute(
+        "INSERT OR REPLACE INTO champion (id, version) VALUES (1, ?)",
+        (version,)
+    )
+
+
+# -----------------------------
+# Queries
+# -----------------------------
+def current_champion(conn=None):
+    """
+    Returns the champion version row as a dict, or None.
+    """
+
+    with _reader(conn) as c:
+        row = c.execute(
+            """
+            SELECT v.* FROM champion c
+            JOIN versions v ON v.version = c.version
+            WHERE c.id = 1
+            """
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+
+def get_run(run_id, conn=None):
+    with _reader(conn) as c:
+        row = c.execute("SELECT * FROM runs WHERE run_id=?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run["metrics"] = json.loads(run["metrics"])
+        return run
+
+
+def run_for_fingerprint(fingerprint, conn=None):
+    """
+    The run trained on data/config with this fingerprint, or None.
+    """
+
+    with _reader(conn) as c:
+        row = c.execute(
+            """
+            SELECT r.* FROM fingerprints f
+            JOIN runs r ON r.run_id = f.run_id
+            WHERE f.fingerprint = ?
+            """,
+            (fingerprint,)
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    run = dict(row)
+    run["metrics"] = json.loads(run["metrics"])
+    return run
+
+
+def top_runs(k=10, metric="rmse", ascending=True, conn=None):
+    """
+    Best k runs by a metric (lower is better by default).
+    rmse is served from its index; other metrics are read from the JSON.
+    """
+
+    if metric == "rmse":
+        expr = "rmse"
+    elif re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", metric):
+        expr = f"json_extract(metrics, '$.{metric}')"
+    else:
+        raise ValueError(f"Invalid metric name: {metric}")
+
+    order = "ASC" if ascending else "DESC"
+
+    with _reader(conn) as c:
+        rows = c.execute(
+            f"""
+            SELECT * FROM runs
+            WHERE {expr} IS NOT NULL
+            ORDER BY {expr} {order}
+            LIMIT ?
+            """,
+            (k,)
+        ).fetchall()
+
+    runs = []
+    for row in rows:
+        run = dict(row)
+        run["metrics"] = json.loads(run["metrics"])
+        runs.append(run)
+    return runs
+
+
+def lineage(version, conn=None):
+    """
+    Chain of promoted versions from `version` back to the first one.
+    Accepts a version number or name (e.g. 3 or "v3.ref").
+    """
+
+    with _reader(conn) as c:
+        if isinstance(version, str):
+            row = c.execute("SELECT version FROM versions WHERE name=?", (version,)).fetchone()
+            if row is None:
+                return []
+            version = row["version"]
+
+        rows = c.execute(
+            """
+            WITH RECURSIVE chain(version, depth) AS (
+                SELECT ?, 0
+                UNION ALL
+                SELECT v.parent_version, chain.depth + 1
+                FROM versions v JOIN chain ON v.version = chain.version
+                WHERE v.parent_version IS NOT NULL
+            )
+            SELECT v.* FROM chain JOIN versions v ON v.version = chain.version
+            ORDER BY chain.depth
+            """,
+            (version,)
+        ).fetchall()
+
+        return [dict(row) for row in rows]
+
+
+# -----------------------------
+# CLI
+# -----------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Query the model registry catalog.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    top = sub.add_parser("top", help="best runs by metric")
+    top.add_argument("-k", type=int, default=10)
+    top.add_argument("--metric", default="rmse")
+    top.add_argument("--desc", action="store_true", help="higher is better")
+
+    sub.add_parser("champion", help="current champion version")
+
+    lin = sub.add_parser("lineage", help="promotion chain of a version")
+    lin.add_argument("version")
+
+    run = sub.add_parser("run", help="a single run")
+    run.add_argument("run_id")
+
+    args = parser.parse_args()
+
+    if args.command == "top":
+        result = top_runs(args.k, args.metric, ascending=not args.desc)
+    elif args.command == "champion":
+        result = current_champion()
+    elif args.command == "lineage":
+        version = int(args.version) if args.version.isdigit() else args.version
+        result = lineage(version)
+    else:
+        result = get_run(args.run_id)
+
+    print(json.dumps(result, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,14 @@
-import json
+import os
 import shutil
+from datetime import datetime
 from pathlib import Path
 
+from src.registry.artifacts import load_model
+from src.registry.blob_store import blob_path, digest_of, flat_dir, put_file, write_ref, REF_SUFFIX
+from src.registry import catalog
+from src.preprocessing.encoding import save_encoder, unwrap
+from src.inference.flat_forest import flatten_forest, check_parity, save_flat_forest, ENCODER_FILE
+from src.monitoring.drift import save_sketch, sketch_path
 from src.logging.event_logger import log_message, log_event
 
 
@@ -11,19 +18,77 @@ PROMOTED_DIR = MODELS_DIR / "promoted"
 CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
 
 
-def _get_next_version():
-    existing = list(PROMOTED_DIR.glob("v*.pkl"))
-    if not existing:
-        return 1
-    versions = [int(f.stem.replace("v", "")) for f in existing]
-    return max(versions) + 1
+def _publish_current(name):
+    # Written beside the pointer and renamed over it, so the serving
+    # watcher never reads an empty or half-written file
+    tmp_path = CURRENT_MODEL_FILE.with_name(f".{CURRENT_MODEL_FILE.name}.tmp")
+    tmp_path.write_text(name)
+    os.replace(tmp_path, CURRENT_MODEL_FILE)
 
 
-def promote_model(run_path, new_metrics):
+def _run_model_path(run_path):
+    # New runs hold a blob reference; older runs a full model.pkl
+    ref_path = run_path / f"model{REF_SUFFIX}"
+    return ref_path if ref_path.exists() else run_path / "model.pkl"
+
+
+def _export_flat(digest, version):
+    """
+    Flatten a promoted forest into contiguous arrays for the serving engine,
+    together with the encoder vocabulary, so serving can score from the
+    arrays alone. Exported once per blob; skipped (returns False) for
+    unsupported models or on a parity mismatch.
+    """
+
+    encoder_path = flat_dir(digest) / ENCODER_FILE
+    if encoder_path.exists():
+        return True
+
+    try:
+        # The flat engine scores encoded inputs, same as the inner model
+        encoder, model = unwrap(load_model(blob_path(digest)))
+
+        # Exports from before the encoder was written only need it added
+        if not flat_dir(digest).exists():
+            flat = flatten_forest(model)
+            if flat is None:
+                return False
+
+            ok, max_abs_diff = check_parity(model, flat)
+            if not ok:
+                log_message(f"Flat export skipped for v{version}: parity mismatch.")
+                log_event("FLAT_EXPORT_FAILED", {
+                    "version": f"v{version}",
+                    "max_abs_diff": max_abs_diff
+                })
+                return False
+
+            save_flat_forest(flat, flat_dir(digest))
+            log_event("FLAT_EXPORTED", {
+                "version": f"v{version}",
+                "trees": flat.n_trees,
+                "nodes": len(flat.feature),
+                "max_abs_diff": max_abs_diff
+            })
+
+        save_encoder(encoder, encoder_path)
+        return True
+
+    except Exception as e:
+        # The pickled model is still served; flat export is an optimization
+        log_message(f"Flat export failed for v{version}: {e}")
+        log_event("FLAT_EXPORT_FAILED", {"version": f"v{version}", "error": str(e)})
+        return False
+
+
+def promote_model(run_path, new_metrics, sketch=None):
     PROMOTED_DIR.mkdir(parents=True, exist_ok=True)
 
     """
     Promote model if RMSE improves.
+    A feature sketch of the training data, if given, is stored with the
+    version as the drift reference; it may be a callable, built only if
+    the model is promoted.
     """
 
     if run_path is None:
@@ -33,59 +98,64 @@ def promote_model(run_path, new_metrics):
     if new_rmse is None:
         return False
 
-    # If no current model → promote immediately
-    if not CURRENT_MODEL_FILE.exists() or CURRENT_MODEL_FILE.stat().st_size == 0:
-
-        version = _get_next_version()
-        model_dest = PROMOTED_DIR / f"v{version}.pkl"
-        metrics_dest = PROMOTED_DIR / f"v{version}_metrics.json"
-
-        shutil.copy(run_path / "model.pkl", model_dest)
-        shutil.copy(run_path / "metrics.json", metrics_dest)
-
-        CURRENT_MODEL_FILE.write_text(model_dest.name)
-
+    # Promotion is a pointer write: the model blob is shared with the run.
+    # Legacy runs hold a full model.pkl, which is stored as a blob first.
+    model_path = _run_model_path(run_path)
+    digest = digest_of(model_path) if model_path.suffix == REF_SUFFIX else put_file(model_path)
+
+    # Compare-and-promote under the catalog's write lock, so concurrent
+    # pipelines cannot both claim a version or both beat the same champion
+    with catalog.transaction() as conn:
+        champion = catalog.current_champion(conn)
+        current_rmse = champion["rmse"] if champion is not None else None
+
+        if current_rmse is not None and not new_rmse < current_rmse:
+            log_message("Model not promoted (no improvement).")
+            log_event("PROMOTION_REJECTED", {
+                "new_rmse": new_rmse,
+                "current_rmse": current_rmse
+            })
+            return False
+
+        version = catalog.next_version(conn)
+        model_dest = PROMOTED_DIR / f"v{version}{REF_SUFFIX}"
+        promoted_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+        catalog.add_version(
+            conn, version, model_dest.name, run_path.name, digest, new_rmse,
+            champion["version"] if champion is not None else None,
+            promoted_at=promoted_at
+        )
+        catalog.set_champion(conn, version)
+
+    # Files only for a committed version (a rolled-back promotion leaves
+    # no orphan ref); current_model.txt is published after them
+    write_ref(model_dest, digest, run_id=run_path.name, promoted_at=promoted_at)
+    shutil.copy(run_path / "metrics.json", PROMOTED_DIR / f"v{version}_metrics.json")
+    if callable(sketch):
+        sketch = sketch()
+    if sketch is not None:
+        save_sketch(sketch, sketch_path(model_dest.name))
+
+    # Export outside the lock; serving picks up the arrays with the pointer
+    _export_flat(digest, version)
+
+    # Publish whatever the catalog holds now, in case a later promotion
+    # committed while we were exporting. A champion whose ref is not on
+    # disk yet is left to its own promotion to publish.
+    with catalog.transaction() as conn:
+        current = catalog.current_champion(conn)["name"]
+        if (PROMOTED_DIR / current).exists():
+            _publish_current(current)
+
+    if champion is None:
         log_message(f"First model promoted as {model_dest.name}")
-        log_event("MODEL_PROMOTED", {
-            "version": model_dest.name,
-            "rmse": new_rmse
-        })
-
-        return True
-
-    # Load current metrics
-    current_version = CURRENT_MODEL_FILE.read_text().strip()
-    current_metrics_file = PROMOTED_DIR / current_version.replace(".pkl", "_metrics.json")
-
-    with open(current_metrics_file, "r") as f:
-        current_metrics = json.load(f)
-
-    current_rmse = current_metrics.get("rmse")
-
-    # Compare
-    if new_rmse < current_rmse:
-
-        version = _get_next_version()
-        model_dest = PROMOTED_DIR / f"v{version}.pkl"
-        metrics_dest = PROMOTED_DIR / f"v{version}_metrics.json"
-
-        shutil.copy(run_path / "model.pkl", model_dest)
-        shutil.copy(run_path / "metrics.json", metrics_dest)
-
-        CURRENT_MODEL_FILE.write_text(model_dest.name)
-
+    else:
         log_message(f"New model promoted as {model_dest.name}")
-        log_event("MODEL_PROMOTED", {
-            "version": model_dest.name,
-            "rmse": new_rmse
-        })
-
-        return True
 
-    log_message("Model not promoted (no improvement).")
-    log_event("PROMOTION_REJECTED", {
-        "new_rmse": new_rmse,
-        "current_rmse": current_rmse
+    log_event("MODEL_PROMOTED", {
+        "version": model_dest.name,
+        "rmse": new_rmse
     })
 
-    return False
+    return True
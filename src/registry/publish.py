@@ -0,0 +1,63 @@
+from pathlib import Path
+
+import yaml
+
+from src.registry.blob_store import blob_path, flat_dir, read_ref, REF_SUFFIX
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+MODELS_DIR = BASE_DIR / "models"
+PROMOTED_DIR = MODELS_DIR / "promoted"
+CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
+
+
+def served_versions():
+    """
+    Versions the API can load: the current model plus any version that
+    routing sends traffic to or shadows.
+    Returns set of version file names.
+    """
+
+    versions = set()
+    if CURRENT_MODEL_FILE.exists() and CURRENT_MODEL_FILE.stat().st_size > 0:
+        versions.add(CURRENT_MODEL_FILE.read_text().strip())
+
+    path = CONFIG_DIR / "serving.yaml"
+    if path.exists():
+        with open(path, "r") as f:
+            routing = (yaml.safe_load(f) or {}).get("routing", {}) or {}
+
+        versions.update((routing.get("weights") or {}).keys())
+        if routing.get("shadow_version"):
+            versions.add(routing["shadow_version"])
+
+    return versions
+
+
+def published_paths():
+    """
+    Blob files a git checkout needs to serve: the model blob and flat
+    arrays of each served version. Everything else in the blob store
+    stays in the CI cache.
+    Returns sorted list of paths relative to the repository root.
+    """
+
+    paths = []
+    for name in served_versions():
+        ref_path = PROMOTED_DIR / name
+        if ref_path.suffix != REF_SUFFIX or not ref_path.exists():
+            continue
+
+        digest = read_ref(ref_path)
+        if blob_path(digest).exists():
+            paths.append(blob_path(digest))
+        if flat_dir(digest).exists():
+            paths += [p for p in flat_dir(digest).rglob("*") if p.is_file()]
+
+    return sorted(str(p.relative_to(BASE_DIR)) for p in paths)
+
+
+if __name__ == "__main__":
+    for path in published_paths():
+        print(path)
@@ -0,0 +1,274 @@
+import argparse
+import json
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import yaml
+
+from src.registry import catalog
+from src.registry.publish import served_versions
+from src.registry.blob_store import BLOBS_DIR, blob_path, flat_dir, read_ref, REF_SUFFIX
+from src.logging.event_logger import log_message, log_event
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+MODELS_DIR = BASE_DIR / "models"
+EXPERIMENTS_DIR = MODELS_DIR / "experiments"
+PROMOTED_DIR = MODELS_DIR / "promoted"
+
+DEFAULT_POLICY = {
+    "enabled": False,
+    "keep_last_runs": 20,
+    "keep_top_runs": 5,
+    "keep_promoted_days": 30,
+    "blob_grace_minutes": 60
+}
+
+
+def _load_policy():
+    with open(CONFIG_DIR / "training.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    return {**DEFAULT_POLICY, **(config.get("retention") or {})}
+
+
+def _size(path):
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size if path.exists() else 0
+
+
+# -----------------------------
+# Selection
+# -----------------------------
+def _select_runs(conn, policy, protected_runs):
+    """
+    Runs outside the newest keep_last_runs and the best keep_top_runs.
+    Both reads walk an index for a bounded number of rows, so a pass
+    only touches the runs added since the last one (plus the kept top K),
+    not the whole history.
+    Returns list of {run_id, blob}, oldest first.
+    """
+
+    keep = set(protected_runs)
+    keep.update(row["run_id"] for row in conn.execute(
+        "SELECT run_id FROM runs WHERE rmse IS NOT NULL ORDER BY rmse ASC LIMIT ?",
+        (policy["keep_top_runs"],)
+    ))
+
+    rows = conn.execute(
+        "SELECT run_id, blob FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?",
+        (policy["keep_last_runs"],)
+    ).fetchall()
+    return [dict(row) for row in reversed(rows) if row["run_id"] not in keep]
+
+
+def _select_versions(conn, policy, protected_names):
+    cutoff = datetime.utcnow() - timedelta(days=policy["keep_promoted_days"])
+    rows = conn.execute(
+        "SELECT version, name, run_id, blob FROM versions WHERE promoted_at < ? ORDER BY version",
+        (cutoff.strftime("%Y-%m-%d %H:%M:%S"),)
+    ).fetchall()
+    return [dict(row) for row in rows if row["name"] not in protected_names]
+
+
+def _version_files(name):
+    stem = Path(name).stem
+    return [
+        PROMOTED_DIR / name,
+        PROMOTED_DIR / f"{stem}_metrics.json",
+        PROMOTED_DIR / f"{stem}_sketch.json"
+    ]
+
+
+def _referenced_blobs(conn, removed_runs, removed_versions):
+    """
+    Every digest referenced by the catalog or by any ref file on disk,
+    ignoring the runs/versions selected for removal.
+    Returns set of digests.
+    """
+
+    referenced = set()
+
+    for row in conn.execute("SELECT run_id, blob FROM runs"):
+        if row["blob"] and row["run_id"] not in removed_runs:
+            referenced.add(row["blob"])
+
+    for row in conn.execute("SELECT name, blob FROM versions"):
+        if row["blob"] and row["name"] not in removed_versions:
+            referenced.add(row["blob"])
+
+    ref_paths = [
+        p for p in EXPERIMENTS_DIR.glob(f"run_*/model{REF_SUFFIX}")
+        if p.parent.name not in removed_runs
+    ] + [
+        p for p in PROMOTED_DIR.glob(f"v*{REF_SUFFIX}")
+        if p.name not in removed_versions
+    ]
+
+    for ref_path in ref_paths:
+        try:
+            referenced.add(read_ref(ref_path))
+        except (OSError, ValueError, KeyError):
+            continue
+
+    return referenced
+
+
+def _stored_digests():
+    digests = set()
+    for path in BLOBS_DIR.glob("*/*"):
+        digests.add(path.name[:-len("_flat")] if path.name.endswith("_flat") else path.stem)
+    return digests
+
+
+def _expired_blobs(conn, referenced, grace_minutes, dry_run):
+    """
+    Sweep the whole blob store. An unreferenced blob is recorded in
+    blob_gc the first time a pass sees it and is collected once it has
+    stayed unreferenced for grace_minutes; a blob referenced again is
+    taken off the list. The age lives in the catalog, not in file
+    mtimes, which a checkout or cache restore resets.
+    Returns list of digests due for deletion.
+    """
+
+    now = datetime.utcnow()
+    cutoff = (now - timedelta(minutes=grace_minutes)).strftime("%Y-%m-%d %H:%M:%S")
+    pending = {
+        row["digest"]: row["unreferenced_since"]
+        for row in conn.execute("SELECT digest, unreferenced_since FROM blob_gc")
+    }
+    stored = _stored_digests()
+
+    expired, marked = [], []
+    for digest in sorted(stored - referenced):
+        if digest not in pending:
+            marked.append(digest)
+        elif pending[digest] < cutoff:
+            expired.append(digest)
+
+    if not dry_run:
+        # Referenced again, or already gone from disk
+        for digest in (set(pending) & referenced) | (set(pending) - stored):
+            conn.execute("DELETE FROM blob_gc WHERE digest=?", (digest,))
+        conn.executemany(
+            "INSERT INTO blob_gc (digest, unreferenced_since) VALUES (?, ?)",
+            [(digest, now.strftime("%Y-%m-%d %H:%M:%S")) for digest in marked]
+        )
+        conn.executemany("DELETE FROM blob_gc WHERE digest=?", [(digest,) for digest in expired])
+
+    return expired
+
+
+def _blob_paths(digests):
+    paths = []
+    for digest in digests:
+        paths += [path for path in (blob_path(digest), flat_dir(digest)) if path.exists()]
+    return paths
+
+
+def _remove(path):
+    if path.is_dir():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+
+
+# -----------------------------
+# Apply
+# -----------------------------
+def apply_retention(dry_run=False, policy=None):
+    """
+    Delete runs, promoted versions and blobs that fall outside the policy.
+    The current model (and any version served by routing) is always kept.
+    Every blob nothing references is collected once it has been
+    unreferenced for blob_grace_minutes.
+    Returns report dict; with dry_run=True nothing is deleted.
+    """
+
+    policy = {**DEFAULT_POLICY, **(policy or _load_policy())}
+
+    protected_names = served_versions()
+
+    report = {"dry_run": dry_run, "runs": [], "versions": [], "blobs": [], "bytes_freed": 0}
+
+    # Catalog rows are removed under the write lock, so a concurrent
+    # promotion cannot reference something while it is being removed.
+    # Run and version files are deleted only once that removal has
+    # committed; blobs are deleted under the lock, because registration
+    # checks its blob is still there under the same lock.
+    with catalog.transaction() as conn:
+        champion = catalog.current_champion(conn)
+        if champion is not None:
+            protected_names.add(champion["name"])
+
+        versions = _select_versions(conn, policy, protected_names)
+
+        # Runs behind a surviving version are kept with it
+        protected_runs = {row["run_id"] for row in conn.execute(
+            "SELECT run_id FROM versions WHERE run_id IS NOT NULL"
+        ) if row["run_id"]}
+        protected_runs -= {v["run_id"] for v in versions}
+
+        runs = _select_runs(conn, policy, protected_runs)
+        report["runs"] = [run["run_id"] for run in runs]
+        report["versions"] = [version["name"] for version in versions]
+        removed_runs, removed_versions = set(report["runs"]), set(report["versions"])
+
+        doomed = [EXPERIMENTS_DIR / run_id for run_id in report["runs"]]
+        for name in report["versions"]:
+            doomed += _version_files(name)
+
+        referenced = _referenced_blobs(conn, removed_runs, removed_versions)
+        blobs = _blob_paths(_expired_blobs(conn, referenced, policy["blob_grace_minutes"], dry_run))
+        report["blobs"] = [path.name for path in blobs]
+        report["bytes_freed"] = sum(_size(path) for path in doomed + blobs)
+
+        if not dry_run:
+            for run_id in report["runs"]:
+                conn.execute("DELETE FROM runs WHERE run_id=?", (run_id,))
+                conn.execute("DELETE FROM fingerprints WHERE run_id=?", (run_id,))
+            for version in versions:
+                conn.execute("DELETE FROM versions WHERE version=?", (version["version"],))
+            for path in blobs:
+                _remove(path)
+
+    if not dry_run:
+        for path in doomed:
+            _remove(path)
+
+    log_message(
+        f"Retention {'dry run' if dry_run else 'applied'}: "
+        f"{len(report['runs'])} runs, {len(report['versions'])} versions, "
+        f"{len(report['blobs'])} blobs, {report['bytes_freed']} bytes."
+    )
+    log_event("RETENTION_APPLIED", {
+        "dry_run": dry_run,
+        "runs": len(report["runs"]),
+        "versions": report["versions"],
+        "blobs": len(report["blobs"]),
+        "bytes_freed": report["bytes_freed"]
+    })
+
+    return report
+
+
+def run_retention():
+    """
+    Pipeline hook: apply the configured policy if it is enabled.
+    Returns report dict or None.
+    """
+
+    policy = _load_policy()
+    if not policy.get("enabled"):
+        return None
+    return apply_retention(dry_run=policy.get("dry_run", False), policy=policy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply the model retention policy.")
+    parser.add_argument("--dry-run", action="store_true", help="report without deleting")
+    args = parser.parse_args()
+
+    print(json.dumps(apply_retention(dry_run=args.dry_run), indent=4))
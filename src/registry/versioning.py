@@ -1,8 +1,10 @@
 import json
-import joblib
+import uuid
 from datetime import datetime
 from pathlib import Path
 
+from src.registry.blob_store import blob_path, put_model, write_ref, REF_SUFFIX
+from src.registry.catalog import transaction, record_run, record_fingerprint
 from src.logging.event_logger import log_message, log_event
 
 
@@ -10,10 +12,25 @@ BASE_DIR = Path(__file__).resolve().parents[2]
 MODELS_DIR = BASE_DIR / "models"
 EXPERIMENTS_DIR = MODELS_DIR / "experiments"
 
+# Written next to the run's metrics, so a rebuilt catalog keeps the cache
+FINGERPRINT_FILE = "fingerprint.txt"
 
-def register_experiment(model, metrics):
+
+def new_run_id(now=None):
+    """
+    run_<YYYYmmdd_HHMMSS>_<microseconds>_<random>: sorts by time like the
+    older second-resolution names and stays unique across parallel runs.
     """
-    Save model and metrics to a timestamped experiment folder.
+
+    now = now or datetime.utcnow()
+    return f"run_{now.strftime('%Y%m%d_%H%M%S_%f')}_{uuid.uuid4().hex[:6]}"
+
+
+def register_experiment(model, metrics, fingerprint=None):
+    """
+    Save model and metrics to a new experiment folder.
+    A training fingerprint, if given, is indexed so identical reruns can
+    reuse this run.
     Returns run_path.
     """
 
@@ -22,23 +39,44 @@ def register_experiment(model, metrics):
         log_event("REGISTRATION_SKIPPED", {"reason": "no_model"})
         return None
 
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    run_dir = EXPERIMENTS_DIR / f"run_{timestamp}"
-    run_dir.mkdir(parents=True, exist_ok=True)
+    created_at = datetime.utcnow()
+    run_dir = EXPERIMENTS_DIR / new_run_id(created_at)
+
+    # Save model into the content-addressed store (an unreferenced blob is
+    # harmless; retention collects it)
+    digest = put_model(model)
 
-    model_path = run_dir / "model.pkl"
-    metrics_path = run_dir / "metrics.json"
+    # Catalog first: files are only written for a committed run, so a
+    # failed insert leaves nothing behind that points at the blob
+    with transaction() as conn:
+        record_run(
+            run_dir.name,
+            metrics,
+            blob=digest,
+            created_at=created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            conn=conn
+        )
+        if fingerprint is not None:
+            record_fingerprint(fingerprint, run_dir.name, conn=conn)
 
-    # Save model
-    joblib.dump(model, model_path)
+        # A deduplicated blob may have been collected by retention since
+        # put_model saw it; under the lock the run now pins it
+        if not blob_path(digest).exists():
+            put_model(model)
 
-    # Save metrics
-    with open(metrics_path, "w") as f:
+    run_dir.mkdir(parents=True)
+    write_ref(run_dir / f"model{REF_SUFFIX}", digest)
+
+    with open(run_dir / "metrics.json", "w") as f:
         json.dump(metrics, f, indent=4)
 
+    if fingerprint is not None:
+        (run_dir / FINGERPRINT_FILE).write_text(fingerprint)
+
     log_message(f"Experiment registered at {run_dir.name}")
     log_event("EXPERIMENT_REGISTERED", {
         "run": run_dir.name,
+        "blob": digest,
         "metrics": metrics
     })
 
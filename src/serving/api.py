@@ -1,10 +1,26 @@
-from fastapi import FastAPI, Request, Form
+from fastapi import FastAPI, Request, Form, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-import joblib
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, NamedTuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import random
+import yaml
 from pathlib import Path
 import pandas as pd
 
+from src.serving.batching import PredictionCoalescer
+from src.serving.cache import PredictionCache
+from src.serving.model_watcher import ModelFileWatcher
+from src.serving.model_pool import ModelPool
+from src.registry.artifacts import load_model
+from src.registry.blob_store import digest_of, flat_dir, resolve
+from src.inference.flat_forest import load_flat_forest, SmallBatchDispatcher, ENCODER_FILE
+from src.preprocessing.encoding import load_encoder, wrap, unwrap
+from src.logging.event_logger import log_message, log_event
+
 app = FastAPI()
 
 # -----------------------------
@@ -14,42 +30,431 @@ BASE_DIR = Path(__file__).resolve().parents[2]
 MODELS_DIR = BASE_DIR / "models"
 PROMOTED_DIR = MODELS_DIR / "promoted"
 CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
+CONFIG_DIR = BASE_DIR / "config"
 
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
+# -----------------------------
+# Serving config
+# -----------------------------
+with open(CONFIG_DIR / "serving.yaml", "r") as f:
+    serving_config = yaml.safe_load(f) or {}
+
+MAX_BATCH_SIZE = serving_config.get("batch", {}).get("max_batch_size", 100000)
+MAX_BATCH_BYTES = serving_config.get("batch", {}).get("max_body_mb", 64) * 1024 * 1024
+COALESCER_CONFIG = serving_config.get("coalescer", {})
+CACHE_CONFIG = serving_config.get("cache", {})
+WATCHER_CONFIG = serving_config.get("watcher", {})
+ROUTING_CONFIG = serving_config.get("routing", {})
+
+ROUTING_HEADER = ROUTING_CONFIG.get("header", "X-Model-Version")
+ROUTE_WEIGHTS = ROUTING_CONFIG.get("weights") or {}
+SHADOW_VERSION = ROUTING_CONFIG.get("shadow_version")
+SHADOW_MAX_PENDING = ROUTING_CONFIG.get("shadow_max_pending", 100)
+ARTIFACTS_CONFIG = serving_config.get("artifacts", {})
+MMAP_ARTIFACTS = ARTIFACTS_CONFIG.get("mmap", True)
+CHAMPION = "champion"
+
 # -----------------------------
 # Global model state
 # -----------------------------
-model = None
-active_version = None
+class LoadedModel(NamedTuple):
+    model: Any
+    version: Optional[str]
 
 
-def load_current_model():
-    global model, active_version
+# Swapped with a single assignment; requests read it once and keep
+# using that snapshot, so in-flight requests finish on the old version.
+current = LoadedModel(None, None)
+
+prediction_cache = PredictionCache(
+    max_entries=CACHE_CONFIG.get("max_entries", 100000),
+    ttl_seconds=CACHE_CONFIG.get("ttl_seconds", 3600),
+    round_decimals=CACHE_CONFIG.get("round_decimals", 2)
+)
 
+
+def _read_current_version():
     if not CURRENT_MODEL_FILE.exists() or CURRENT_MODEL_FILE.stat().st_size == 0:
-        model = None
-        active_version = None
-        return
+        return None
+
+    return CURRENT_MODEL_FILE.read_text().strip() or None
+
+
+def _deserialize(version):
+    # Reject anything that could escape the promoted directory
+    if Path(version).name != version:
+        return None
 
-    version = CURRENT_MODEL_FILE.read_text().strip()
     model_path = PROMOTED_DIR / version
 
     if not model_path.exists():
-        model = None
-        active_version = None
+        return None
+
+    artifact_path = resolve(model_path)
+    flat_path = flat_dir(digest_of(model_path))
+    use_flat = ARTIFACTS_CONFIG.get("flat_engine", True) and flat_path.exists()
+
+    if use_flat and (flat_path / ENCODER_FILE).exists():
+        # Served from the memory-mapped node arrays; the estimator is only
+        # loaded if a batch above flat_max_rows arrives
+        flat = load_flat_forest(flat_path, mmap=MMAP_ARTIFACTS)
+        inner = SmallBatchDispatcher(
+            None, flat,
+            max_rows=ARTIFACTS_CONFIG.get("flat_max_rows", 256),
+            load_model=lambda: unwrap(load_model(artifact_path, mmap=MMAP_ARTIFACTS))[1]
+        )
+        return wrap(load_encoder(flat_path / ENCODER_FILE), inner), flat.nbytes
+
+    model = load_model(artifact_path, mmap=MMAP_ARTIFACTS)
+    size_bytes = artifact_path.stat().st_size
+
+    # Exports without the encoder vocabulary need the pickled model for it
+    if use_flat:
+        # Categoricals are encoded once, in front of whichever engine scores
+        encoder, inner = unwrap(model)
+        flat = load_flat_forest(flat_path, mmap=MMAP_ARTIFACTS)
+        model = wrap(encoder, SmallBatchDispatcher(
+            inner, flat, max_rows=ARTIFACTS_CONFIG.get("flat_max_rows", 256)
+        ))
+
+    return model, size_bytes
+
+
+model_pool = ModelPool(
+    _deserialize,
+    memory_budget_bytes=ROUTING_CONFIG.get("memory_budget_mb", 1024) * 1024 * 1024
+)
+
+
+def _load_version(version):
+    """
+    Returns LoadedModel for version (empty for None).
+    Raises if the version cannot be loaded, so callers keep the model they
+    are serving instead of swapping to nothing.
+    """
+
+    if version is None:
+        return LoadedModel(None, None)
+
+    model = model_pool.load(version)
+
+    if model is None:
+        raise Exception(f"Model {version} not found in promoted models.")
+
+    return LoadedModel(model, version)
+
+
+def _swap_model(loaded: LoadedModel):
+    global current
+
+    previous = current.version
+    current = loaded
+
+    # The champion stays resident; the old one becomes evictable
+    if loaded.version is not None:
+        model_pool.pin(loaded.version)
+    if previous is not None and previous != loaded.version and previous not in _route_targets():
+        model_pool.unpin(previous)
+
+    # Entries are keyed by version, but old versions are dead weight now
+    prediction_cache.clear()
+
+    if loaded.version != previous:
+        log_message(f"Serving model swapped: {previous} -> {loaded.version}")
+        log_event("MODEL_SWAPPED", {"previous": previous, "version": loaded.version})
+
+
+def load_current_model():
+    _swap_model(_load_version(_read_current_version()))
+
+
+_load_lock = asyncio.Lock()
+
+
+async def load_current_model_async(version=None):
+    """
+    Deserialize the promoted model on a worker thread, then swap it in.
+    The event loop keeps serving the old version while the load runs.
+    Raises (keeping the current model) if the pointer is missing or empty.
+    """
+
+    async with _load_lock:
+        if version is None:
+            version = await asyncio.to_thread(_read_current_version)
+
+        if version is None:
+            # Never swap to nothing: keep serving whatever is loaded
+            raise Exception("Current model pointer is missing or empty.")
+        if version == current.version and current.model is not None:
+            # Already picked up (e.g. by /reload)
+            return
+
+        loaded = await asyncio.to_thread(_load_version, version)
+        _swap_model(loaded)
+
+
+model_watcher = ModelFileWatcher(
+    CURRENT_MODEL_FILE,
+    load_current_model_async,
+    poll_interval_seconds=WATCHER_CONFIG.get("poll_interval_seconds", 2.0)
+)
+
+
+def _align_features(input_df: pd.DataFrame, feature_names):
+    if feature_names is None:
+        return input_df
+
+    # Reorder to the fitted feature order; extra fields are ignored
+    missing = [c for c in feature_names if c not in input_df.columns]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing features: {missing}")
+
+    return input_df[list(feature_names)]
+
+
+def _encode_row(row, model):
+    """
+    Encode a request's categoricals once, at parse time, with the encoder
+    bundled in the model that will score it. The cache and the coalescer
+    then only ever see codes.
+    Returns dict.
+    """
+
+    encoder, _ = unwrap(model)
+    return row if encoder is None else encoder.encode_record(row)
+
+
+def _rows_frame(rows, feature_names):
+    # Columns straight from the (already encoded) dicts: no per-row
+    # inference or categorical conversion
+    if feature_names is None:
+        return pd.DataFrame.from_records(rows)
+
+    missing = [c for c in feature_names if c not in rows[0]]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing features: {missing}")
+
+    return pd.DataFrame({name: [row[name] for row in rows] for name in feature_names})
+
+
+def _predict_rows(rows, loaded):
+    """
+    Score a list of single-row feature dicts, encoded for loaded.model by
+    _encode_row, with one predict call on the inner model.
+    Cached rows are answered from the prediction cache; only misses are scored.
+    Returns a list of (prediction, version) tuples.
+    """
+
+    batch_model, version = loaded
+    _, scorer = unwrap(batch_model)
+
+    results = [None] * len(rows)
+    keys = [None] * len(rows)
+
+    if CACHE_CONFIG.get("enabled", False):
+        for i, row in enumerate(rows):
+            keys[i] = prediction_cache.make_key(row, version)
+            results[i] = prediction_cache.get(keys[i])
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if not misses:
+        return results
+
+    input_df = _rows_frame([rows[i] for i in misses], getattr(scorer, "feature_names_in_", None))
+    predictions = scorer.predict(input_df)
+
+    for i, p in zip(misses, predictions):
+        results[i] = (float(p), version)
+        if keys[i] is not None:
+            prediction_cache.put(keys[i], results[i])
+
+    return results
+
+
+def _predict_coalesced(items):
+    """
+    Score coalesced (loaded, encoded row) items. Each row is scored by the
+    snapshot it was encoded for, so a swap mid-batch cannot mix
+    vocabularies; normally the whole batch shares one version.
+    Returns a list of (prediction, version) tuples.
+    """
+
+    groups = {}
+    for i, (loaded, row) in enumerate(items):
+        groups.setdefault(id(loaded.model), (loaded, []))[1].append(i)
+
+    results = [None] * len(items)
+    for loaded, indices in groups.values():
+        scored = _predict_rows([items[i][1] for i in indices], loaded)
+        for i, result in zip(indices, scored):
+            results[i] = result
+
+    return results
+
+
+coalescer = PredictionCoalescer(
+    _predict_coalesced,
+    max_wait_ms=COALESCER_CONFIG.get("max_wait_ms", 5),
+    max_batch_rows=COALESCER_CONFIG.get("max_batch_rows", 256),
+    max_in_flight=COALESCER_CONFIG.get("max_in_flight", 1)
+)
+
+
+# -----------------------------
+# Routing
+# -----------------------------
+def _route_targets():
+    targets = {v for v in ROUTE_WEIGHTS if v != CHAMPION}
+    if SHADOW_VERSION:
+        targets.add(SHADOW_VERSION)
+    return targets
+
+
+async def _route(request: Request) -> LoadedModel:
+    """
+    Pick the version for a request: explicit header first, then the
+    weighted split, then the champion. The header may only name the
+    champion or a configured route/shadow target, so clients cannot pull
+    arbitrary versions into the pool.
+    """
+
+    version = request.headers.get(ROUTING_HEADER) if ROUTING_HEADER else None
+
+    if version is not None and version not in (CHAMPION, current.version) \
+            and version not in _route_targets():
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+
+    if version is None and ROUTE_WEIGHTS:
+        version = random.choices(
+            list(ROUTE_WEIGHTS), weights=list(ROUTE_WEIGHTS.values())
+        )[0]
+
+    champion = current
+    if version is None or version == CHAMPION or version == champion.version:
+        return champion
+
+    model = model_pool.get(version)
+    if model is None:
+        model = await asyncio.to_thread(model_pool.load, version)
+    if model is None:
+        raise HTTPException(status_code=404, detail=f"Unknown model version: {version}")
+
+    return LoadedModel(model, version)
+
+
+# -----------------------------
+# Shadow scoring
+# -----------------------------
+# One dedicated thread: shadow work queues behind itself, never in front
+# of primary scoring.
+_shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+_shadow_tasks = set()
+
+# Shadow jobs submitted and not yet finished; only touched on the event loop
+_shadow_pending = 0
+
+
+def _shadow_done(future):
+    global _shadow_pending
+    _shadow_pending -= 1
+
+    # Mark the outcome retrieved: if the primary failed, nobody awaits it
+    if not future.cancelled():
+        future.exception()
+
+
+def _score_shadow(records):
+    shadow_model = model_pool.get(SHADOW_VERSION)
+    if shadow_model is None:
+        return None
+
+    input_df = _align_features(
+        pd.DataFrame.from_records(records) if isinstance(records, list) else records,
+        getattr(shadow_model, "feature_names_in_", None)
+    )
+    return shadow_model.predict(input_df)
+
+
+def _start_shadow(records, primary_version):
+    """
+    Start scoring the shadow version concurrently with the primary.
+    Returns a future, or None when shadowing does not apply.
+    """
+
+    global _shadow_pending
+
+    if not SHADOW_VERSION or SHADOW_VERSION == primary_version:
+        return None
+    if _shadow_pending >= SHADOW_MAX_PENDING:
+        return None
+
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(_shadow_executor, _score_shadow, records)
+    _shadow_pending += 1
+    future.add_done_callback(_shadow_done)
+    return future
+
+
+def _log_shadow(shadow_future, primary_version, primary_predictions):
+    if shadow_future is None:
         return
 
-    model = joblib.load(model_path)
-    active_version = version
+    async def _finish():
+        try:
+            shadow_predictions = await shadow_future
+        except Exception as e:
+            log_event("SHADOW_FAILED", {"shadow": SHADOW_VERSION, "error": str(e)})
+            return
+
+        if shadow_predictions is None:
+            return
+
+        diff = abs(pd.Series(shadow_predictions) - pd.Series(primary_predictions))
+        log_event("SHADOW_PREDICTION", {
+            "primary": primary_version,
+            "shadow": SHADOW_VERSION,
+            "rows": len(diff),
+            "primary_mean": float(pd.Series(primary_predictions).mean()),
+            "shadow_mean": float(pd.Series(shadow_predictions).mean()),
+            "mean_abs_diff": float(diff.mean()),
+            "max_abs_diff": float(diff.max())
+        })
+
+    task = asyncio.get_running_loop().create_task(_finish())
+    _shadow_tasks.add(task)
+    task.add_done_callback(_shadow_tasks.discard)
 
 
 # -----------------------------
 # Load model at startup
 # -----------------------------
 @app.on_event("startup")
-def startup_event():
-    load_current_model()
+async def startup_event():
+    try:
+        await load_current_model_async()
+    except Exception as e:
+        # Start without a model; the watcher or /reload picks it up later
+        log_message(f"Initial model load failed: {e}")
+        log_event("MODEL_LOAD_FAILED", {"error": str(e)})
+
+    # Route and shadow targets are loaded up front and kept resident
+    for version in _route_targets():
+        model_pool.pin(version)
+        if await asyncio.to_thread(model_pool.load, version) is None:
+            log_message(f"Routing target {version} not found in promoted models.")
+
+    if COALESCER_CONFIG.get("enabled", False):
+        coalescer.start()
+
+    if WATCHER_CONFIG.get("enabled", False):
+        model_watcher.start(current.version)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await model_watcher.stop()
+    await coalescer.stop()
 
 
 # -----------------------------
@@ -62,13 +467,13 @@ def home(request: Request):
         {
             "request": request,
             "prediction": None,
-            "version": active_version
+            "version": current.version
         }
     )
 
 
 @app.post("/predict", response_class=HTMLResponse)
-def predict(
+async def predict(
     request: Request,
 
     # Numerical
@@ -85,49 +490,199 @@ def predict(
     discount_applied: bool = Form(...),
 
 ):
-    if model is None:
+    if current.model is None:
         return templates.TemplateResponse(
             "index.html",
             {
                 "request": request,
                 "prediction": "No model available yet.",
-                "version": active_version
+                "version": current.version
             }
         )
 
     # -----------------------------
-    # Build input dataframe
+    # Build input row
     # -----------------------------
-    input_df = pd.DataFrame([{
+    row = {
         "quantity": quantity,
         "line_net_amount": line_net_amount,
         "total_items": total_items,
-        "Customer_Category": customer_category,
         "loyalty_status": loyalty_status,
         "payment_method": payment_method,
         "discount_applied": discount_applied,
+    }
+
+    loaded = await _route(request)
+    shadow_future = _start_shadow([row], loaded.version)
+    encoded = _encode_row(row, loaded.model)
 
-    }])
+    # Concurrent champion requests are scored together by the coalescer
+    if coalescer.running and loaded.version == current.version:
+        prediction, version = await coalescer.submit((loaded, encoded))
+    else:
+        prediction, version = (await asyncio.to_thread(_predict_rows, [encoded], loaded))[0]
 
-    prediction = model.predict(input_df)[0]
+    _log_shadow(shadow_future, version, [prediction])
 
     return templates.TemplateResponse(
         "index.html",
         {
             "request": request,
             "prediction": f"Predicted Avg 7-Day Spend: ₹{round(prediction, 2)}",
-            "version": active_version
+            "version": version
         }
     )
 
 
+# -----------------------------
+# Batch predictions (JSON)
+# -----------------------------
+class BatchPredictRequest(BaseModel):
+    # Row-oriented: [{"quantity": 1.0, ...}, ...]
+    records: Optional[List[Dict[str, Any]]] = None
+    # Column-oriented: {"quantity": [1.0, ...], ...}
+    columns: Optional[Dict[str, List[Any]]] = None
+
+
+def _batch_rows(body: dict):
+    # Row count of the raw JSON, checked before anything is built from it
+    if isinstance(body.get("records"), list):
+        return len(body["records"])
+    if isinstance(body.get("columns"), dict):
+        return max((len(v) for v in body["columns"].values() if isinstance(v, list)), default=0)
+    return 0
+
+
+def _parse_batch(body: bytes):
+    """
+    Decode and validate a /predict/batch body. The row limit is enforced
+    on the decoded JSON, before pydantic or pandas touch the rows.
+    Returns BatchPredictRequest.
+    """
+
+    try:
+        data = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Request body is not valid JSON.")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=422, detail="Request body must be a JSON object.")
+
+    rows = _batch_rows(data)
+    if rows > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {rows} rows exceeds max_batch_size {MAX_BATCH_SIZE}."
+        )
+
+    try:
+        return BatchPredictRequest.model_validate(data)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+
+def _build_batch_frame(payload: BatchPredictRequest):
+    if payload.records is not None:
+        input_df = pd.DataFrame.from_records(payload.records)
+    elif payload.columns is not None:
+        try:
+            input_df = pd.DataFrame(payload.columns)
+        except ValueError:
+            raise HTTPException(status_code=422, detail="All columns must have the same length.")
+    else:
+        raise HTTPException(status_code=422, detail="Provide either 'records' or 'columns'.")
+
+    return input_df
+
+
+def _build_batch_frames(body: bytes, feature_names):
+    """
+    Returns (raw frame for shadow scoring, frame aligned to feature_names).
+    """
+
+    raw_df = _build_batch_frame(_parse_batch(body))
+    return raw_df, _align_features(raw_df, feature_names)
+
+
+async def _read_body(request: Request):
+    # Refused by size before it is buffered: from Content-Length when
+    # given, while streaming otherwise
+    length = request.headers.get("content-length")
+    if length is not None and length.isdigit() and int(length) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {MAX_BATCH_BYTES} bytes (max_body_mb).")
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > MAX_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {MAX_BATCH_BYTES} bytes (max_body_mb).")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@app.post(
+    "/predict/batch",
+    openapi_extra={"requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": BatchPredictRequest.model_json_schema()}}
+    }}
+)
+async def predict_batch(request: Request):
+    body = await _read_body(request)
+
+    # Read once so the whole batch is scored by a single version
+    batch_model, version = await _route(request)
+
+    if batch_model is None:
+        raise HTTPException(status_code=503, detail="No model available yet.")
+
+    # Parse, validate and build the frame on a worker thread (rows are
+    # counted before any of it), so the event loop keeps serving
+    raw_df, input_df = await asyncio.to_thread(
+        _build_batch_frames, body, getattr(batch_model, "feature_names_in_", None)
+    )
+
+    if input_df.empty:
+        return {"active_version": version, "count": 0, "predictions": []}
+
+    shadow_future = _start_shadow(raw_df, version)
+    predictions = await asyncio.to_thread(batch_model.predict, input_df)
+    _log_shadow(shadow_future, version, predictions)
+
+    return {
+        "active_version": version,
+        "count": len(predictions),
+        "predictions": predictions.tolist()
+    }
+
+
+# -----------------------------
+# Serving stats
+# -----------------------------
+@app.get("/stats")
+def serving_stats():
+    return {
+        "active_version": current.version,
+        "coalescer": coalescer.stats(),
+        "cache": prediction_cache.stats(),
+        "models": model_pool.stats(),
+        "shadow_pending": _shadow_pending
+    }
+
+
 # -----------------------------
 # Optional: Manual reload endpoint
 # -----------------------------
 @app.get("/reload")
-def reload_model():
-    load_current_model()
+async def reload_model():
+    try:
+        await load_current_model_async()
+    except Exception as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Reload failed, still serving {current.version}: {e}"
+        )
     return {
         "status": "Model reloaded",
-        "active_version": active_version
+        "active_version": current.version
     }
@@ -0,0 +1,159 @@
+import asyncio
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PredictionCoalescer:
+    """
+    Collect concurrent single-row requests and score them in one call.
+    A batch closes after max_wait_ms or max_batch_rows, whichever comes
+    first. Up to max_in_flight batches are scored at once; while they are,
+    the next batch keeps filling, so batch size grows with load.
+    If a batch fails, its rows are rescored one by one, so a bad row only
+    fails its own request.
+    """
+
+    def __init__(self, predict_fn, max_wait_ms=5, max_batch_rows=256, max_in_flight=1,
+                 stats_window=1000):
+        # predict_fn(rows: list) -> one result per row; rows are opaque here
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.max_in_flight = max_in_flight
+
+        self._queue = None
+        self._task = None
+        self._slots = None
+        self._scoring = set()
+
+        self._batches = 0
+        self._rows = 0
+        self._fallbacks = 0
+        self._queue_waits_ms = deque(maxlen=stats_window)
+        self._batch_sizes = deque(maxlen=stats_window)
+
+    # -----------------------------
+    # Lifecycle
+    # -----------------------------
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Batches already handed to a worker thread finish normally
+        if self._scoring:
+            await asyncio.gather(*self._scoring, return_exceptions=True)
+
+    @property
+    def running(self):
+        return self._task is not None and not self._task.done()
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+    async def submit(self, row):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Wait for a free scoring slot, then take whatever queued up
+            # meanwhile; the loop goes straight back to collecting
+            await self._slots.acquire()
+            while len(batch) < self.max_batch_rows and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            task = loop.create_task(self._score(batch))
+            self._scoring.add(task)
+            task.add_done_callback(self._scoring.discard)
+
+    def _predict_each(self, rows):
+        # One row at a time: returns (ok, result or exception) per row
+        outcomes = []
+        for row in rows:
+            try:
+                outcomes.append((True, self.predict_fn([row])[0]))
+            except Exception as e:
+                outcomes.append((False, e))
+        return outcomes
+
+    async def _score(self, batch):
+        try:
+            scored_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self._queue_waits_ms.append((scored_at - enqueued_at) * 1000.0)
+
+            self._batches += 1
+            self._rows += len(batch)
+            self._batch_sizes.append(len(batch))
+
+            rows = [row for row, _, _ in batch]
+
+            try:
+                # Scoring is CPU-bound: keep the event loop free to accept requests
+                outcomes = [(True, r) for r in await asyncio.to_thread(self.predict_fn, rows)]
+            except Exception as e:
+                if len(rows) == 1:
+                    outcomes = [(False, e)]
+                else:
+                    self._fallbacks += 1
+                    outcomes = await asyncio.to_thread(self._predict_each, rows)
+
+            for (_, future, _), (ok, result) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if ok:
+                    future.set_result(result)
+                else:
+                    future.set_exception(result)
+        finally:
+            self._slots.release()
+
+    # -----------------------------
+    # Stats
+    # -----------------------------
+    def stats(self):
+        waits = np.fromiter(self._queue_waits_ms, dtype=float)
+        sizes = np.fromiter(self._batch_sizes, dtype=float)
+
+        return {
+            "batches": self._batches,
+            "rows": self._rows,
+            "fallbacks": self._fallbacks,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "mean_batch_rows": float(sizes.mean()) if len(sizes) else 0.0,
+            "queue_wait_ms": {
+                "mean": float(waits.mean()) if len(waits) else 0.0,
+                "p50": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                "p95": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                "max": float(waits.max()) if len(waits) else 0.0
+            }
+        }
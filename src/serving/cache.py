@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a TTL for single-row predictions.
+    Keys are the normalized feature tuple plus the model version, so a
+    new version never sees another version's entries.
+    """
+
+    def __init__(self, max_entries=100000, ttl_seconds=3600, round_decimals=2):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.round_decimals = round_decimals
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, row: dict, version):
+        normalized = []
+        for name in sorted(row):
+            value = row[name]
+            if isinstance(value, bool):
+                pass
+            elif isinstance(value, (int, float)):
+                value = round(float(value), self.round_decimals)
+            elif isinstance(value, str):
+                value = value.strip()
+            normalized.append((name, value))
+
+        return (version, tuple(normalized))
+
+    def get(self, key):
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or (self.ttl_seconds and now - entry[1] > self.ttl_seconds):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+from src.logging.event_logger import log_message, log_event
+
+
+class ModelPool:
+    """
+    Keep several promoted versions resident under a memory budget.
+    Least recently used versions are evicted first; pinned versions
+    (the champion and configured route/shadow targets) are never evicted.
+    Artifact size on disk is used as the memory estimate.
+    """
+
+    def __init__(self, load_fn, memory_budget_bytes):
+        # load_fn(version) -> (model, size_bytes) or None
+        self.load_fn = load_fn
+        self.memory_budget_bytes = memory_budget_bytes
+
+        self._entries = OrderedDict()
+        self._pinned = set()
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        with self._lock:
+            entry = self._entries.get(version)
+            if entry is None:
+                return None
+            self._entries.move_to_end(version)
+            return entry[0]
+
+    def load(self, version):
+        """
+        Return the resident model, deserializing it first if needed.
+        Blocking: call from a worker thread, not the event loop.
+        Returns model or None if the version does not exist.
+        """
+
+        model = self.get(version)
+        if model is not None:
+            return model
+
+        loaded = self.load_fn(version)
+        if loaded is None:
+            return None
+
+        model, size_bytes = loaded
+
+        with self._lock:
+            self._entries[version] = (model, size_bytes)
+            self._entries.move_to_end(version)
+            self._evict(keep=version)
+
+        return model
+
+    def pin(self, version):
+        with self._lock:
+            self._pinned.add(version)
+
+    def unpin(self, version):
+        with self._lock:
+            self._pinned.discard(version)
+            self._evict()
+
+    def _evict(self, keep=None):
+        total = sum(size for _, size in self._entries.values())
+
+        for version in list(self._entries):
+            if total <= self.memory_budget_bytes:
+                break
+            if version in self._pinned or version == keep:
+                continue
+
+            _, size = self._entries.pop(version)
+            total -= size
+
+            log_message(f"Evicted model {version} from serving pool.")
+            log_event("MODEL_EVICTED", {"version": version, "size_bytes": size})
+
+    def stats(self):
+        with self._lock:
+            return {
+                "resident": list(self._entries),
+                "pinned": sorted(self._pinned),
+                "resident_bytes": sum(size for _, size in self._entries.values()),
+                "memory_budget_bytes": self.memory_budget_bytes
+            }
@@ -0,0 +1,60 @@
+import asyncio
+
+from src.logging.event_logger import log_message, log_event
+
+
+class ModelFileWatcher:
+    """
+    Poll a pointer file (models/current_model.txt) and call on_change
+    whenever its contents change. Polling keeps this dependency-free and
+    works on every filesystem the pipeline commits to.
+    """
+
+    def __init__(self, path, on_change, poll_interval_seconds=2.0):
+        # on_change(version: str) is a coroutine function
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval_seconds
+
+        self._task = None
+        self._last_seen = None
+
+    def _read(self):
+        try:
+            if not self.path.exists() or self.path.stat().st_size == 0:
+                return None
+            return self.path.read_text().strip() or None
+        except OSError:
+            return None
+
+    def start(self, current_version=None):
+        self._last_seen = current_version
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+
+            # A missing or empty pointer never unloads the served model
+            version = await asyncio.to_thread(self._read)
+            if version is None or version == self._last_seen:
+                continue
+
+            try:
+                await self.on_change(version)
+                self._last_seen = version
+            except Exception as e:
+                # Keep serving the old model; retry on the next poll
+                log_message(f"Model hot swap to {version} failed: {e}")
+                log_event("MODEL_SWAP_FAILED", {"version": version, "error": str(e)})
@@ -0,0 +1,370 @@
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.logging.event_logger import log_message, log_event
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DATA_DIR = BASE_DIR / "data"
+STORE_DIR = DATA_DIR / "store"
+MANIFEST_PATH = STORE_DIR / "manifest.json"
+# Sidecar lock files: the manifest is shared by every process on the host
+MANIFEST_LOCK_PATH = STORE_DIR / ".manifest.lock"
+COMPACTION_LOCK_PATH = STORE_DIR / ".compaction.lock"
+
+INGESTED_AT_COLUMN = "_ingested_at"
+# Source row id: ingestion is at-least-once, so appends dedupe on it
+ID_COLUMN = "id"
+
+# Segments below this many rows are candidates for compaction
+SMALL_SEGMENT_ROWS = 50000
+# Compaction starts once this many small segments have piled up
+MIN_SEGMENTS_TO_COMPACT = 8
+
+_manifest_lock = threading.Lock()
+_compaction_lock = threading.Lock()
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+@contextmanager
+def _manifest_locked():
+    """
+    Hold the manifest for a read-modify-write: the thread lock orders
+    threads in this process, the flock other processes (overlapping
+    pipeline runs).
+    """
+
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    with _manifest_lock, open(MANIFEST_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_manifest():
+    if not MANIFEST_PATH.exists():
+        return {"segments": []}
+
+    with open(MANIFEST_PATH, "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(manifest):
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+# -----------------------------
+# Segment IO
+# -----------------------------
+def _to_array(series: pd.Series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy()
+
+    # Fixed-width unicode keeps string columns memory-mappable
+    return series.astype(str).to_numpy(dtype=str)
+
+
+def _write_segment(df: pd.DataFrame, ingested_at):
+    """
+    Write one segment directory (one .npy file per column).
+    Returns the segment entry for the manifest.
+    """
+
+    name = f"seg_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    tmp_dir = STORE_DIR / f".{name}.tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    for col in df.columns:
+        np.save(tmp_dir / f"{col}.npy", _to_array(df[col]), allow_pickle=False)
+
+    np.save(tmp_dir / f"{INGESTED_AT_COLUMN}.npy", ingested_at, allow_pickle=False)
+
+    entry = {
+        "name": name,
+        "rows": len(df),
+        "columns": list(df.columns),
+        "min_ingested_at": int(ingested_at.min()),
+        "max_ingested_at": int(ingested_at.max())
+    }
+
+    ids = df[ID_COLUMN].dropna() if ID_COLUMN in df.columns else None
+    if ids is not None and len(ids):
+        entry["min_id"] = int(ids.min())
+        entry["max_id"] = int(ids.max())
+
+    os.replace(tmp_dir, STORE_DIR / name)
+    return entry
+
+
+def _read_segment(entry, columns=None, since=None):
+    seg_dir = STORE_DIR / entry["name"]
+    columns = [c for c in (columns or entry["columns"]) if c in entry["columns"]]
+
+    ingested_at = np.load(seg_dir / f"{INGESTED_AT_COLUMN}.npy", mmap_mode="r")
+    mask = None
+    if since is not None and entry["min_ingested_at"] < since:
+        mask = ingested_at >= since
+
+    data = {}
+    for col in columns:
+        arr = np.load(seg_dir / f"{col}.npy", mmap_mode="r")
+        data[col] = arr[mask] if mask is not None else np.asarray(arr)
+
+    data[INGESTED_AT_COLUMN] = (
+        ingested_at[mask] if mask is not None else np.asarray(ingested_at)
+    )
+
+    return pd.DataFrame(data)
+
+
+def _read_segments(since, columns):
+    frames = []
+    for entry in _read_manifest()["segments"]:
+        if since is not None and entry["max_ingested_at"] < since:
+            continue
+        frames.append(_read_segment(entry, columns=columns, since=since))
+    return frames
+
+
+def _stored_ids(segments, low, high):
+    """
+    Ids already stored in [low, high]. Only segments whose id range
+    overlaps are opened (memory-mapped), so fresh id ranges cost nothing.
+    Returns ndarray.
+    """
+
+    found = []
+    for entry in segments:
+        if "min_id" not in entry or entry["max_id"] < low or entry["min_id"] > high:
+            continue
+        ids = np.load(STORE_DIR / entry["name"] / f"{ID_COLUMN}.npy", mmap_mode="r")
+        found.append(np.asarray(ids[(ids >= low) & (ids <= high)]))
+    return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+
+def _drop_stored(df, segments):
+    # Re-delivered rows (an expired lease read twice) are already stored
+    df = df[~df[ID_COLUMN].duplicated()]
+    ids = df[ID_COLUMN].to_numpy()
+    stored = _stored_ids(segments, ids.min(), ids.max())
+    if len(stored) == 0:
+        return df
+    return df[~np.isin(ids, stored)]
+
+
+# -----------------------------
+# Public API
+# -----------------------------
+def append_batch(df: pd.DataFrame):
+    """
+    Append a validated micro-batch to the local training store.
+    Rows whose id is already stored are dropped, so a re-delivered
+    chunk is not trained on twice.
+    Returns the new segment name or None.
+    """
+
+    if df is None or df.empty:
+        return None
+
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+    # The id check and the append hold the manifest lock together, so two
+    # workers appending the same range cannot both see it as new
+    with _manifest_locked():
+        manifest = _read_manifest()
+
+        rows_in = len(df)
+        if ID_COLUMN in df.columns:
+            df = _drop_stored(df, manifest["segments"])
+
+        if len(df) < rows_in:
+            log_event("STORE_DUPLICATES_DROPPED", {"rows": rows_in - len(df)})
+        if df.empty:
+            return None
+
+        ingested_at = np.full(len(df), int(time.time()), dtype=np.int64)
+        entry = _write_segment(df.reset_index(drop=True), ingested_at)
+
+        manifest["segments"].append(entry)
+        _write_manifest(manifest)
+
+    log_event("STORE_APPENDED", {
+        "segment": entry["name"],
+        "rows": entry["rows"],
+        "segments_total": len(manifest["segments"])
+    })
+
+    return entry["name"]
+
+
+def _effective_since(window_hours, since):
+    if window_hours is None:
+        return since
+    window_start = int(time.time() - float(window_hours) * 3600)
+    return window_start if since is None else max(since, window_start)
+
+
+def snapshot(window_hours=None, since=None):
+    """
+    Identify the rows read_history would return without reading them:
+    segments are immutable, so a segment name plus the number of its rows
+    in range pins them down. Only the ingestion times of segments that
+    straddle the range are opened (memory-mapped).
+    Returns list of (segment name, rows).
+    """
+
+    since = _effective_since(window_hours, since)
+
+    rows = []
+    for entry in _read_manifest()["segments"]:
+        if since is not None and entry["max_ingested_at"] < since:
+            continue
+        count = entry["rows"]
+        if since is not None and entry["min_ingested_at"] < since:
+            ingested_at = np.load(
+                STORE_DIR / entry["name"] / f"{INGESTED_AT_COLUMN}.npy", mmap_mode="r"
+            )
+            count = int(np.count_nonzero(ingested_at >= since))
+        rows.append((entry["name"], count))
+    return rows
+
+
+def read_history(window_hours=None, columns=None, since=None):
+    """
+    Read accumulated history from the training store.
+    window_hours limits rows to the most recent ingestion window;
+    since (epoch seconds) limits rows to those ingested at or after it.
+    Returns DataFrame (empty if the store has no data).
+    """
+
+    since = _effective_since(window_hours, since)
+
+    try:
+        frames = _read_segments(since, columns)
+    except FileNotFoundError:
+        # A compaction swapped the manifest mid-read; the new one is complete
+        frames = _read_segments(since, columns)
+
+    if not frames:
+        return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+
+    log_message(f"Read {len(df)} rows from training store ({len(frames)} segments).")
+    log_event("STORE_READ", {
+        "rows": len(df),
+        "segments": len(frames),
+        "window_hours": window_hours,
+        "since": since
+    })
+
+    return df.drop(columns=[INGESTED_AT_COLUMN, ID_COLUMN], errors="ignore")
+
+
+def compact(small_segment_rows=SMALL_SEGMENT_ROWS, min_segments=MIN_SEGMENTS_TO_COMPACT):
+    """
+    Merge small segments into a single segment.
+    Returns number of segments merged (0 if nothing to do).
+    """
+
+    if not _compaction_lock.acquire(blocking=False):
+        return 0
+
+    # One compaction per host: a second process would merge the same segments
+    STORE_DIR.mkdir(parents=True, exist_ok=True)
+    lock_file = open(COMPACTION_LOCK_PATH, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        _compaction_lock.release()
+        return 0
+
+    try:
+        manifest = _read_manifest()
+        small = [s for s in manifest["segments"] if s["rows"] < small_segment_rows]
+
+        if len(small) < min_segments:
+            return 0
+
+        frames = []
+        for entry in small:
+            frames.append(_read_segment(entry))
+
+        merged = pd.concat(frames, ignore_index=True)
+        if ID_COLUMN in merged.columns:
+            # Duplicates stored before appends deduped (rows without an
+            # id, from older segments, are all kept)
+            merged = merged[~(merged[ID_COLUMN].notna() & merged[ID_COLUMN].duplicated())]
+        ingested_at = merged.pop(INGESTED_AT_COLUMN).to_numpy(dtype=np.int64)
+        merged_entry = _write_segment(merged, ingested_at)
+
+        small_names = {s["name"] for s in small}
+
+        # Re-read under the lock: appends may have landed while merging
+        with _manifest_locked():
+            manifest = _read_manifest()
+            segments = []
+            inserted = False
+            for entry in manifest["segments"]:
+                if entry["name"] in small_names:
+                    if not inserted:
+                        segments.append(merged_entry)
+                        inserted = True
+                    continue
+                segments.append(entry)
+            manifest["segments"] = segments
+            _write_manifest(manifest)
+
+        # Old segments stay readable for any reader that still has them mapped
+        for name in small_names:
+            shutil.rmtree(STORE_DIR / name, ignore_errors=True)
+
+        log_message(f"Compacted {len(small)} store segments into {merged_entry['name']}.")
+        log_event("STORE_COMPACTED", {
+            "merged_segments": len(small),
+            "rows": merged_entry["rows"],
+            "segment": merged_entry["name"]
+        })
+
+        return len(small)
+
+    except Exception as e:
+        log_message(f"Store compaction failed: {e}")
+        log_event("STORE_COMPACTION_FAILED", {"error": str(e)})
+        return 0
+
+    finally:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        _compaction_lock.release()
+
+
+def start_compaction(**kwargs):
+    """
+    Run compaction on a background thread.
+    The thread is non-daemon, so the interpreter waits for it on exit.
+    Returns the started thread.
+    """
+
+    thread = threading.Thread(target=compact, kwargs=kwargs, name="store-compaction")
+    thread.start()
+    return thread
@@ -0,0 +1,91 @@
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+from src.registry import catalog
+from src.registry.blob_store import blob_path
+from src.storage.columnar_store import snapshot
+from src.logging.event_logger import log_message, log_event
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+MODELS_DIR = BASE_DIR / "models"
+EXPERIMENTS_DIR = MODELS_DIR / "experiments"
+CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
+
+FINGERPRINT_CONFIGS = ("training.yaml", "schema.yaml")
+
+
+def _update_config(digest, incremental):
+    # Incremental runs also depend on the champion they grow
+    for name in FINGERPRINT_CONFIGS:
+        digest.update(name.encode())
+        digest.update((CONFIG_DIR / name).read_bytes())
+
+    if incremental and CURRENT_MODEL_FILE.exists():
+        digest.update(b"champion:" + CURRENT_MODEL_FILE.read_bytes().strip())
+
+
+def compute_fingerprint(X: pd.DataFrame, y: pd.Series, incremental=False):
+    """
+    sha256 over the training data (values, column names, dtypes) and the
+    training/schema config files. Incremental runs also depend on the
+    champion they grow, so its version is included.
+    Returns hex digest.
+    """
+
+    digest = hashlib.sha256()
+
+    digest.update(repr([(str(c), str(t)) for c, t in X.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+
+    _update_config(digest, incremental)
+    return digest.hexdigest()
+
+
+def compute_store_fingerprint(window_hours=None, since=None, incremental=False):
+    """
+    Fingerprint of a training read from the store, taken before the read:
+    the segments and row counts in the training window (see
+    columnar_store.snapshot) plus the config, so a hit skips reading
+    and preprocessing as well as training. A compaction renames the
+    segments it merges, so identical data can miss once after one.
+    Returns hex digest.
+    """
+
+    digest = hashlib.sha256()
+    digest.update(b"store:" + repr(snapshot(window_hours=window_hours, since=since)).encode())
+
+    _update_config(digest, incremental)
+    return digest.hexdigest()
+
+
+def find_cached_run(fingerprint):
+    """
+    Look up a previous run trained on the same data and config.
+    Entries whose run folder or model blob has been removed are dropped
+    (blobs live in the CI cache, which can be evicted).
+    Returns (run_path, metrics) or None.
+    """
+
+    run = catalog.run_for_fingerprint(fingerprint)
+    if run is None:
+        return None
+
+    run_path = EXPERIMENTS_DIR / run["run_id"]
+    blob_missing = not run["blob"] or not blob_path(run["blob"]).exists()
+    if not (run_path / "metrics.json").exists() or blob_missing:
+        catalog.forget_fingerprint(fingerprint)
+        return None
+
+    log_message(f"Training skipped: identical data and config as {run['run_id']}.")
+    log_event("TRAINING_CACHE_HIT", {
+        "fingerprint": fingerprint,
+        "run": run["run_id"],
+        "metrics": run["metrics"]
+    })
+
+    return run_path, run["metrics"]
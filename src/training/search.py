@@ -0,0 +1,147 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from sklearn.linear_model import LinearRegression, SGDRegressor
+from sklearn.ensemble import (
+    RandomForestRegressor,
+    ExtraTreesRegressor,
+    GradientBoostingRegressor
+)
+from sklearn.model_selection import ParameterGrid
+
+from src.logging.event_logger import log_message, log_event
+
+
+MODEL_TYPES = {
+    "linear_regression": LinearRegression,
+    "sgd_regressor": SGDRegressor,
+    "random_forest": RandomForestRegressor,
+    "extra_trees": ExtraTreesRegressor,
+    "gradient_boosting": GradientBoostingRegressor,
+}
+
+
+def build_model(model_type, params=None):
+    """
+    Instantiate a model from its config type name.
+    """
+
+    if model_type not in MODEL_TYPES:
+        raise Exception(f"Unknown model type: {model_type}")
+
+    return MODEL_TYPES[model_type](**(params or {}))
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+_shared = {}
+
+
+def _init_worker(x_path, y_path, n_fit):
+    # Memory-mapped once per worker; every candidate reads the same pages
+    _shared["X"] = np.load(x_path, mmap_mode="r")
+    _shared["y"] = np.load(y_path, mmap_mode="r")
+    _shared["n_fit"] = n_fit
+
+
+def _score_candidate(model_type, params):
+    X, y, n_fit = _shared["X"], _shared["y"], _shared["n_fit"]
+
+    model = build_model(model_type, params)
+
+    # One process per candidate already saturates the cores
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)
+
+    # Rows were shuffled before writing, so both halves are plain slices
+    model.fit(X[:n_fit], y[:n_fit])
+    predictions = model.predict(X[n_fit:])
+
+    rmse = float(np.sqrt(np.mean((y[n_fit:] - predictions) ** 2)))
+    return model_type, params, rmse
+
+
+# -----------------------------
+# Search
+# -----------------------------
+def _expand_candidates(candidates):
+    for candidate in candidates:
+        for params in ParameterGrid(candidate.get("grid") or {}):
+            yield candidate["type"], params
+
+
+def search_best_model(X_train, y_train, search_config, random_state=42):
+    """
+    Score every candidate type / grid point in a process pool.
+    The feature matrix is written once to a memory-mapped file shared by
+    all workers. Returns (model_type, params, rmse) of the best candidate,
+    or None if the search cannot run.
+    """
+
+    try:
+        X = X_train.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        log_message("Model search skipped: features are not numeric.")
+        log_event("SEARCH_SKIPPED", {"reason": "non_numeric_features"})
+        return None
+
+    y = np.asarray(y_train, dtype=np.float64)
+
+    n_validation = int(len(X) * search_config.get("validation_size", 0.2))
+    n_fit = len(X) - n_validation
+    if n_validation == 0 or n_fit == 0:
+        log_message("Model search skipped: not enough rows for a validation split.")
+        log_event("SEARCH_SKIPPED", {"reason": "too_few_rows", "rows": len(X)})
+        return None
+
+    candidates = list(_expand_candidates(search_config.get("candidates", [])))
+    if not candidates:
+        return None
+
+    n_jobs = search_config.get("n_jobs", -1)
+    if n_jobs is None or n_jobs < 1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(candidates))
+
+    order = np.random.RandomState(random_state).permutation(len(X))
+
+    with tempfile.TemporaryDirectory(prefix="model_search_") as tmp_dir:
+        x_path = Path(tmp_dir) / "X.npy"
+        y_path = Path(tmp_dir) / "y.npy"
+        np.save(x_path, np.ascontiguousarray(X[order]))
+        np.save(y_path, y[order])
+        del X, y
+
+        with ProcessPoolExecutor(
+            max_workers=n_jobs,
+            initializer=_init_worker,
+            initargs=(str(x_path), str(y_path), n_fit)
+        ) as pool:
+            futures = [
+                pool.submit(_score_candidate, model_type, params)
+                for model_type, params in candidates
+            ]
+            results = [f.result() for f in futures]
+
+    best_type, best_params, best_rmse = min(results, key=lambda r: r[2])
+
+    log_message(
+        f"Model search completed: {len(results)} candidates on {n_jobs} workers. "
+        f"Best: {best_type} (validation RMSE {best_rmse:.4f})"
+    )
+    log_event("SEARCH_COMPLETED", {
+        "candidates": len(results),
+        "workers": n_jobs,
+        "best_type": best_type,
+        "best_params": best_params,
+        "best_validation_rmse": best_rmse,
+        "results": [
+            {"type": t, "params": p, "validation_rmse": r} for t, p, r in results
+        ]
+    })
+
+    return best_type, best_params, best_rmse
@@ -1,19 +1,81 @@
 import yaml
 from pathlib import Path
-from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
 
+from src.training.search import build_model, search_best_model
+from src.preprocessing.encoding import CategoricalEncoder, wrap, unwrap
+from src.registry.artifacts import load_model
+from src.registry.blob_store import resolve
 from src.logging.event_logger import log_message, log_event
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 CONFIG_DIR = BASE_DIR / "config"
+MODELS_DIR = BASE_DIR / "models"
+PROMOTED_DIR = MODELS_DIR / "promoted"
+CURRENT_MODEL_FILE = MODELS_DIR / "current_model.txt"
 
 
-def train_model(X, y):
+def _load_champion():
+    """
+    Load the currently promoted model.
+    Returns model or None.
+    """
+
+    if not CURRENT_MODEL_FILE.exists() or CURRENT_MODEL_FILE.stat().st_size == 0:
+        return None
+
+    model_path = PROMOTED_DIR / CURRENT_MODEL_FILE.read_text().strip()
+    if not model_path.exists():
+        return None
+
+    # Not memory-mapped: incremental updates modify the model in place
+    return load_model(resolve(model_path), mmap=False)
+
+
+def _grow_champion(champion, X_train, y_train, incremental_config):
+    """
+    Update the champion on the new micro-batch.
+    The batch is encoded with the champion's own (fixed) vocabulary.
+    Returns the updated model, or None if it cannot be grown incrementally.
+    """
+
+    encoder, model = unwrap(champion)
+    if encoder is not None:
+        X_train = encoder.transform(X_train)
+
+    # New data must line up with the features the champion was fitted on
+    fitted_features = getattr(model, "feature_names_in_", None)
+    if fitted_features is None or list(fitted_features) != list(X_train.columns):
+        return None
+
+    # Forests: append trees fitted on the new batch only
+    if hasattr(model, "estimators_") and "warm_start" in model.get_params():
+        new_estimators = incremental_config.get("new_estimators", 50)
+        max_estimators = incremental_config.get("max_estimators", 1000)
+
+        n_estimators = len(model.estimators_) + new_estimators
+        if n_estimators > max_estimators:
+            return None
+
+        model.set_params(warm_start=True, n_estimators=n_estimators)
+        model.fit(X_train, y_train)
+        return champion
+
+    # Linear models with online updates (e.g. SGDRegressor)
+    if hasattr(model, "partial_fit"):
+        model.partial_fit(X_train, y_train)
+        return champion
+
+    return None
+
+
+def train_model(X, y, load_full=None):
     """
     Train model using config settings.
+    load_full: callable returning the full (X, y), for incremental runs
+    whose X/y only hold the new micro-batch; used if the champion cannot
+    be grown and a fresh model has to be fitted.
     Returns model, X_test, y_test.
     """
 
@@ -29,6 +91,9 @@ def train_model(X, y):
     test_size = training_config["split"]["test_size"]
     random_state = training_config["split"]["random_state"]
 
+    mode = training_config.get("training", {}).get("mode", "full")
+    incremental_config = training_config.get("training", {}).get("incremental", {})
+
     # Split
     X_train, X_test, y_train, y_test = train_test_split(
         X, y,
@@ -36,20 +101,59 @@ def train_model(X, y):
         random_state=random_state
     )
 
-    # Model instantiation (config-driven later)
-    rf = RandomForestRegressor(
-    n_estimators=300,
-    random_state=42,
-    n_jobs=-1,
-    max_depth=None,
-    min_samples_split=2,
-    min_samples_leaf=1
-)
+    # -----------------------------
+    # Incremental: grow the champion
+    # -----------------------------
+    model = None
+    if mode == "incremental":
+        champion = _load_champion()
+        if champion is not None:
+            model = _grow_champion(champion, X_train, y_train, incremental_config)
 
-    model.fit(X_train, y_train)
+        if model is None:
+            log_message("Incremental training unavailable; refitting from scratch.")
+            log_event("INCREMENTAL_FALLBACK", {
+                "reason": "no_champion" if champion is None else "champion_not_growable"
+            })
+            mode = "full"
 
-    log_message(f"Training completed. Train size: {len(X_train)}, Test size: {len(X_test)}")
+            # A fresh model must not be fitted on this run's micro-batch alone
+            if load_full is not None:
+                X, y = load_full()
+                X_train, X_test, y_train, y_test = train_test_split(
+                    X, y,
+                    test_size=test_size,
+                    random_state=random_state
+                )
+
+    # -----------------------------
+    # Full: fit a fresh model
+    # -----------------------------
+    if model is None:
+        model_type = training_config["model"]["type"]
+        params = training_config["model"].get("params") or {}
+
+        # Vocabulary comes from the training split and ships with the model
+        encoder = CategoricalEncoder().fit(X_train)
+        X_fit = encoder.transform(X_train)
+
+        search_config = training_config.get("search", {})
+        if search_config.get("enabled", False):
+            best = search_best_model(X_fit, y_train, search_config, random_state)
+            if best is not None:
+                model_type, params, _ = best
+                mode = "search"
+
+        model = build_model(model_type, params)
+        model.fit(X_fit, y_train)
+        model = wrap(encoder, model)
+
+    log_message(
+        f"Training completed ({mode}). Train size: {len(X_train)}, Test size: {len(X_test)}"
+    )
     log_event("TRAINING_COMPLETED", {
+        "mode": mode,
+        "model_type": type(unwrap(model)[1]).__name__,
         "train_size": len(X_train),
         "test_size": len(X_test)
     })
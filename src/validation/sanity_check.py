@@ -1,13 +1,15 @@
-import yaml
+from datetime import datetime
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
+from src.validation.schema_compiler import compile_schema
 from src.logging.event_logger import log_message, log_event
 
 
 BASE_DIR = Path(__file__).resolve().parents[2]
-CONFIG_DIR = BASE_DIR / "config"
-SCHEMA_PATH = CONFIG_DIR / "schema.yaml"
+QUARANTINE_DIR = BASE_DIR / "data" / "quarantine"
 
 
 def validate_df(df: pd.DataFrame) -> bool:
@@ -24,29 +26,13 @@ def validate_df(df: pd.DataFrame) -> bool:
         log_event("VALIDATION_SKIPPED", {"reason": "empty_dataframe"})
         return False
 
-    # Drop DB-only columns if present
-    df = df.drop(columns=["id", "created_at", "customer_id"], errors="ignore")
-
-    # -----------------------------
-    # Load schema
-    # -----------------------------
-    with open(SCHEMA_PATH, "r") as f:
-        schema = yaml.safe_load(f)
-
-    numerical_features = schema["numerical_features"]
-    categorical_features = schema["categorical_features"]
-    target = schema["target"]
-
-    features = numerical_features + categorical_features
-    required_columns = features + [target]
-
-    dtypes = schema.get("dtypes", {})
-    constraints = schema.get("constraints", {})
+    # DB-only columns (id, created_at, customer_id) are simply not checked
+    plan = compile_schema()
 
     # -----------------------------
     # 1️⃣ Column presence check
     # -----------------------------
-    missing_columns = set(required_columns) - set(df.columns)
+    missing_columns = plan.missing_columns(df)
     if missing_columns:
         log_message(f"Validation failed: Missing columns {missing_columns}")
         log_event(
@@ -56,56 +42,138 @@ def validate_df(df: pd.DataFrame) -> bool:
         raise Exception(f"Missing columns: {missing_columns}")
 
     # -----------------------------
-    # 2️⃣ Null check
+    # 2️⃣-4️⃣ Nulls, types and constraints, in one pass
+    # -----------------------------
+    report, _, _ = plan.scan(df, transform=False)
+    raise_for_report(plan, report)
+
     # -----------------------------
-    if df[required_columns].isnull().any().any():
+    # Validation success
+    # -----------------------------
+    log_message("Validation passed successfully.")
+    log_event(
+        "VALIDATION_PASSED",
+        {"rows_validated": len(df)}
+    )
+
+    return True
+
+
+def raise_for_report(plan, report):
+    """
+    Fail on the first problem in a SchemaPlan.scan() report, in validation
+    order: nulls, then types, then constraints.
+    Raises Exception; returns None when the report is clean.
+    """
+
+    if report["null_columns"]:
         log_message("Validation failed: Null values detected.")
         log_event("VALIDATION_FAILED", {"reason": "null_values"})
         raise Exception("Null values detected in required columns.")
 
-    # -----------------------------
-    # 3️⃣ Type compatibility check
-    # -----------------------------
-    for col, expected_type in dtypes.items():
-        if col not in df.columns:
-            continue
+    if report["type_error"] is not None:
+        col, expected = report["type_error"]
+        raise Exception(f"Column {col} is not {expected} type.")
 
-        if expected_type == "int":
-            if not pd.api.types.is_integer_dtype(df[col]):
-                raise Exception(f"Column {col} is not integer type.")
+    if report["min_violations"]:
+        col = report["min_violations"][0]
+        log_message(f"Validation failed: {col} below minimum.")
+        log_event(
+            "VALIDATION_FAILED",
+            {"reason": "min_constraint", "column": col}
+        )
+        raise Exception(f"{col} has values below minimum {plan.min_constraints[col]}.")
 
-        elif expected_type == "float":
-            if not pd.api.types.is_numeric_dtype(df[col]):
-                raise Exception(f"Column {col} is not numeric type.")
 
-        elif expected_type == "boolean":
-            if not pd.api.types.is_bool_dtype(df[col]):
-                raise Exception(f"Column {col} is not boolean type.")
+# -----------------------------
+# Quarantine mode
+# -----------------------------
+def _write_quarantine(rows: pd.DataFrame):
+    QUARANTINE_DIR.mkdir(parents=True, exist_ok=True)
+    path = QUARANTINE_DIR / f"quarantine_{datetime.utcnow().strftime('%Y%m%d')}.jsonl"
+    rows.to_json(path, orient="records", lines=True, mode="a", date_format="iso")
+    return path
 
-        elif expected_type == "string":
-            if not pd.api.types.is_object_dtype(df[col]):
-                raise Exception(f"Column {col} is not string type.")
 
-    # -----------------------------
-    # 4️⃣ Constraint checks
-    # -----------------------------
-    for col, rule in constraints.items():
-        if col in df.columns and "min" in rule:
-            if (df[col] < rule["min"]).any():
-                log_message(f"Validation failed: {col} below minimum.")
-                log_event(
-                    "VALIDATION_FAILED",
-                    {"reason": "min_constraint", "column": col}
-                )
-                raise Exception(f"{col} has values below minimum {rule['min']}.")
+def _split_chunk(df: pd.DataFrame, plan, chunk_index):
+    coerced, masks = plan.row_violations(df)
 
-    # -----------------------------
-    # Validation success
-    # -----------------------------
-    log_message("Validation passed successfully.")
-    log_event(
-        "VALIDATION_PASSED",
-        {"rows_validated": len(df)}
+    bad = np.zeros(len(df), dtype=bool)
+    for mask in masks.values():
+        bad |= mask
+
+    if bad.any():
+        reasons = pd.Series("", index=df.index[bad], dtype=object)
+        for code, mask in masks.items():
+            reasons[mask[bad]] += code + ";"
+
+        quarantined = df.loc[bad].assign(
+            quarantine_reasons=reasons.str.rstrip(";"),
+            quarantined_at=datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        )
+        _write_quarantine(quarantined)
+
+    clean = df.loc[~bad] if bad.any() else df
+    if coerced:
+        clean = clean.assign(**{col: series.loc[clean.index] for col, series in coerced.items()})
+        for col in plan.boolean_columns & set(coerced):
+            clean[col] = clean[col].astype(bool)
+
+    summary = {
+        "chunk": chunk_index,
+        "rows": len(df),
+        "clean": len(clean),
+        "quarantined": int(bad.sum()),
+        "reasons": {code: int(mask.sum()) for code, mask in masks.items()}
+    }
+    log_event("VALIDATION_CHUNK", summary)
+
+    return clean, summary
+
+
+def quarantine_invalid_rows(df: pd.DataFrame, chunk_rows=None) -> pd.DataFrame:
+    """
+    Row-level validation: rows breaking any schema rule are appended to
+    data/quarantine with reason codes, the rest are returned with schema
+    dtypes. Works chunk_rows at a time and logs a summary per chunk.
+    Missing columns still raise; they are a schema problem, not a row problem.
+    Returns DataFrame of clean rows (may be empty).
+    """
+
+    if df is None or df.empty:
+        log_message("Validation skipped: DataFrame is empty.")
+        log_event("VALIDATION_SKIPPED", {"reason": "empty_dataframe"})
+        return pd.DataFrame() if df is None else df
+
+    plan = compile_schema()
+
+    missing_columns = plan.missing_columns(df)
+    if missing_columns:
+        log_message(f"Validation failed: Missing columns {missing_columns}")
+        log_event(
+            "VALIDATION_FAILED",
+            {"reason": "missing_columns", "columns": list(missing_columns)}
+        )
+        raise Exception(f"Missing columns: {missing_columns}")
+
+    chunk_rows = chunk_rows or len(df)
+    clean_chunks = []
+    quarantined = 0
+
+    for chunk_index, start in enumerate(range(0, len(df), chunk_rows)):
+        clean, summary = _split_chunk(df.iloc[start:start + chunk_rows], plan, chunk_index)
+        clean_chunks.append(clean)
+        quarantined += summary["quarantined"]
+
+    clean = clean_chunks[0] if len(clean_chunks) == 1 else pd.concat(clean_chunks)
+
+    log_message(
+        f"Validation passed {len(clean)} rows, quarantined {quarantined}."
     )
+    log_event("VALIDATION_PASSED", {
+        "rows_validated": len(df),
+        "rows_clean": len(clean),
+        "rows_quarantined": quarantined
+    })
 
-    return True
+    return clean
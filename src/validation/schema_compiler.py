@@ -0,0 +1,253 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yaml
+
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+CONFIG_DIR = BASE_DIR / "config"
+SCHEMA_PATH = CONFIG_DIR / "schema.yaml"
+
+_TYPE_CHECKS = {
+    "int": (pd.api.types.is_integer_dtype, "integer"),
+    "float": (pd.api.types.is_numeric_dtype, "numeric"),
+    "boolean": (pd.api.types.is_bool_dtype, "boolean"),
+    "string": (pd.api.types.is_object_dtype, "string"),
+}
+
+_BOOLEAN_VALUES = {
+    True: True, False: False, 1: True, 0: False,
+    "true": True, "false": False, "t": True, "f": False,
+    "1": True, "0": False, "yes": True, "no": False,
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class SchemaPlan:
+    """
+    schema.yaml resolved into column lists, dtype checks and constraint
+    bounds, so each stage works from plain lookups instead of re-parsing.
+    scan() checks and converts every column in one pass and never copies
+    the frame.
+    """
+
+    def __init__(self, schema):
+        self.dataset = schema.get("dataset")
+        self.target = schema["target"]
+        self.numerical_features = list(schema.get("numerical_features") or [])
+        self.categorical_features = list(schema.get("categorical_features") or [])
+
+        self.features = self.numerical_features + self.categorical_features
+        self.required_columns = self.features + [self.target]
+        # The target is also listed as a feature; check each column once
+        self.check_columns = list(dict.fromkeys(self.required_columns))
+
+        dtypes = schema.get("dtypes") or {}
+        self.dtypes = dict(dtypes)
+        self.boolean_columns = {col for col, expected in dtypes.items() if expected == "boolean"}
+
+        self.type_checks = {
+            col: _TYPE_CHECKS[expected]
+            for col, expected in dtypes.items()
+            if expected in _TYPE_CHECKS
+        }
+
+        self.min_constraints = {
+            col: rule["min"]
+            for col, rule in (schema.get("constraints") or {}).items()
+            if rule and "min" in rule
+        }
+
+        # Every column any rule touches, required ones first
+        self.scan_columns = list(dict.fromkeys(
+            self.check_columns + list(self.type_checks) + list(self.min_constraints)
+        ))
+        self._required = set(self.check_columns)
+        self._categorical = set(self.categorical_features)
+
+    # -----------------------------
+    # Single pass: checks + model dtypes
+    # -----------------------------
+    def missing_columns(self, df):
+        return set(self.required_columns) - set(df.columns)
+
+    def _to_model_dtype(self, col, series):
+        # Categoricals become category dtype: small integer codes plus one
+        # copy of each distinct string
+        if col in self._categorical:
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype("category")
+        elif col in self.boolean_columns:
+            if not pd.api.types.is_bool_dtype(series.dtype):
+                series = series.astype(bool)
+        elif not pd.api.types.is_numeric_dtype(series.dtype):
+            series = pd.to_numeric(series, errors="coerce")
+        return series
+
+    def scan(self, df, check=True, transform=True):
+        """
+        One pass over the schema columns: each column is checked (nulls,
+        dtype, min) and converted to its model dtype while it is in hand.
+        Columns that already have the model dtype are passed through
+        untouched. Call missing_columns() first.
+        Returns (report, X, y). report holds null_columns, type_error
+        ((column, expected label) of the first mismatch in schema order, or
+        None) and min_violations; X and y are None unless transform.
+        """
+
+        null_columns = []
+        type_errors = {}
+        min_violations = []
+        converted = {}
+
+        for col in self.scan_columns:
+            if col not in df.columns:
+                continue
+            series = df[col]
+
+            if check:
+                if col in self._required and series.hasnans:
+                    null_columns.append(col)
+
+                type_check = self.type_checks.get(col)
+                if type_check is not None and not type_check[0](series.dtype):
+                    type_errors[col] = type_check[1]
+
+            if transform and col in self._required:
+                converted[col] = self._to_model_dtype(col, series)
+
+            # A column of the wrong type is already reported; its raw
+            # values may not compare against the bound
+            minimum = self.min_constraints.get(col)
+            values = converted.get(col, None if col in type_errors else series)
+            if check and minimum is not None and values is not None:
+                if np.any(values.to_numpy() < minimum):
+                    min_violations.append(col)
+
+        report = {
+            "null_columns": null_columns,
+            "type_error": next(
+                ((col, type_errors[col]) for col in self.type_checks if col in type_errors), None
+            ),
+            "min_violations": [col for col in self.min_constraints if col in min_violations]
+        }
+
+        if not transform:
+            return report, None, None
+
+        X = pd.DataFrame({col: converted[col] for col in self.features}, copy=False)
+        y = converted[self.target].astype(float, copy=False)
+
+        return report, X, y
+
+    # -----------------------------
+    # Per-row checks (quarantine mode)
+    # -----------------------------
+    def _coerce(self, series, expected):
+        if expected in ("int", "float"):
+            if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+                return series
+            return pd.to_numeric(series, errors="coerce")
+
+        if expected == "boolean":
+            if pd.api.types.is_bool_dtype(series.dtype):
+                return series
+            values = series.str.lower() if pd.api.types.is_string_dtype(series.dtype) else series
+            return values.map(_BOOLEAN_VALUES)
+
+        if expected == "string" and not pd.api.types.is_object_dtype(series.dtype):
+            return series.astype(str).where(series.notna())
+
+        return series
+
+    def coerce_booleans(self, df):
+        """
+        Convert boolean columns that arrive as 0/1 or t/f (SQLite, COPY
+        CSV) to bool, in place. A column holding anything else is left as
+        is, so validation still reports it.
+        Returns df.
+        """
+
+        for col in self.boolean_columns:
+            if col not in df.columns or pd.api.types.is_bool_dtype(df[col].dtype):
+                continue
+
+            series = df[col]
+            converted = self._coerce(series, "boolean")
+            if (converted.isna() & series.notna()).any():
+                continue
+
+            df[col] = converted if converted.hasnans else converted.astype(bool)
+
+        return df
+
+    def row_violations(self, df):
+        """
+        Evaluate every rule on every row at once.
+        Returns (coerced, masks): coerced maps column -> Series converted to
+        the schema dtype (only for columns that needed it); masks maps a
+        reason code ("null:<col>", "type:<col>", "min:<col>") to a boolean
+        array of offending rows. Rules with no offending rows are omitted.
+        """
+
+        coerced = {}
+        masks = {}
+
+        for col in self.check_columns:
+            series = df[col]
+            null = series.isna().to_numpy()
+            if null.any():
+                masks[f"null:{col}"] = null
+
+            converted = self._coerce(series, self.dtypes.get(col))
+            if converted is not series:
+                mismatch = converted.isna().to_numpy() & ~null
+                if mismatch.any():
+                    masks[f"type:{col}"] = mismatch
+                coerced[col] = converted
+
+        for col, minimum in self.min_constraints.items():
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(coerced.get(col, df[col]), errors="coerce").to_numpy(dtype=float)
+            with np.errstate(invalid="ignore"):
+                below = values < minimum
+            if below.any():
+                masks[f"min:{col}"] = below
+
+        return coerced, masks
+
+    def transform(self, df):
+        """
+        Build (X, y) from a raw frame, without checks.
+        """
+
+        _, X, y = self.scan(df, check=False)
+        return X, y
+
+
+def compile_schema(path=SCHEMA_PATH):
+    """
+    Compiled plan for schema.yaml, cached per process.
+    Recompiled when the file's mtime changes.
+    """
+
+    path = Path(path)
+    mtime = path.stat().st_mtime_ns
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, "r") as f:
+        plan = SchemaPlan(yaml.safe_load(f))
+
+    with _cache_lock:
+        _cache[path] = (mtime, plan)
+
+    return plan
@@ -0,0 +1,13 @@
+import pytest
+
+from src.logging import event_logger
+
+
+@pytest.fixture(autouse=True)
+def isolated_logs(tmp_path, monkeypatch):
+    # Keep test runs out of the repository's logs/
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    monkeypatch.setattr(event_logger, "_human_writer", event_logger.BufferedLogWriter(log_dir / "retraining.log"))
+    monkeypatch.setattr(event_logger, "_event_writer", event_logger.BufferedLogWriter(log_dir / "events.jsonl"))
+    return log_dir
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.tree import DecisionTreeRegressor
+
+from src.inference.flat_forest import (
+    check_parity,
+    compare_latency,
+    flatten_forest,
+    load_flat_forest,
+    sample_inputs,
+    save_flat_forest,
+)
+
+
+FEATURES = ["quantity", "line_net_amount", "total_items", "discount_applied"]
+
+
+def _training_data(n_rows=2000, missing_fraction=0.0, seed=0):
+    rng = np.random.RandomState(seed)
+    X = pd.DataFrame({
+        "quantity": rng.randint(1, 10, n_rows).astype(float),
+        "line_net_amount": rng.gamma(2.0, 50.0, n_rows),
+        "total_items": rng.randint(1, 20, n_rows).astype(float),
+        "discount_applied": rng.randint(0, 2, n_rows).astype(float),
+    })
+    y = X["line_net_amount"] * (1 - 0.1 * X["discount_applied"]) + rng.normal(0, 5, n_rows)
+
+    if missing_fraction:
+        X = X.mask(rng.rand(*X.shape) < missing_fraction)
+
+    return X, y
+
+
+def _with_missing(X, fraction=0.2, seed=1):
+    rng = np.random.RandomState(seed)
+    return X.mask(rng.rand(*X.shape) < fraction)
+
+
+@pytest.fixture(scope="module")
+def forest():
+    X, y = _training_data()
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def forest_with_missing():
+    X, y = _training_data(missing_fraction=0.1)
+    return RandomForestRegressor(n_estimators=25, max_depth=8, random_state=0).fit(X, y)
+
+
+def _as_frame(flat, n_rows=1000):
+    return pd.DataFrame(sample_inputs(flat, n_rows=n_rows), columns=FEATURES)
+
+
+def test_flatten_matches_forest(forest):
+    flat = flatten_forest(forest)
+
+    assert flat.n_trees == 25
+    assert list(flat.feature_names_in_) == FEATURES
+
+    ok, max_abs_diff = check_parity(forest, flat)
+    assert ok, max_abs_diff
+
+
+def test_flatten_matches_forest_on_training_rows(forest):
+    X, _ = _training_data(n_rows=500, seed=3)
+
+    ok, max_abs_diff = check_parity(forest, flatten_forest(forest), X)
+    assert ok, max_abs_diff
+
+
+def test_flatten_matches_single_tree():
+    X, y = _training_data()
+    tree = DecisionTreeRegressor(max_depth=6, random_state=0).fit(X, y)
+
+    ok, max_abs_diff = check_parity(tree, flatten_forest(tree))
+    assert ok, max_abs_diff
+
+
+@pytest.mark.parametrize("fixture", ["forest", "forest_with_missing"])
+def test_nan_inputs_follow_sklearn_routing(request, fixture):
+    model = request.getfixturevalue(fixture)
+    flat = flatten_forest(model)
+    X = _with_missing(_as_frame(flat))
+
+    assert X.isna().any().all()
+    ok, max_abs_diff = check_parity(model, flat, X)
+    assert ok, max_abs_diff
+
+
+def test_saved_forest_keeps_parity(tmp_path, forest_with_missing):
+    flat = flatten_forest(forest_with_missing)
+    save_flat_forest(flat, tmp_path / "flat")
+
+    loaded = load_flat_forest(tmp_path / "flat")
+    X = _with_missing(_as_frame(flat))
+
+    ok, max_abs_diff = check_parity(forest_with_missing, loaded, X)
+    assert ok, max_abs_diff
+    np.testing.assert_array_equal(loaded.missing_left, flat.missing_left)
+
+
+def test_export_without_missing_routing_still_loads(tmp_path, forest):
+    flat = flatten_forest(forest)
+    save_flat_forest(flat, tmp_path / "flat")
+    (tmp_path / "flat" / "missing_left.npy").unlink()
+
+    loaded = load_flat_forest(tmp_path / "flat")
+
+    assert not loaded.missing_left.any()
+    ok, max_abs_diff = check_parity(forest, loaded)
+    assert ok, max_abs_diff
+
+
+def test_unsupported_model_is_not_flattened():
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    X, y = _training_data(n_rows=200)
+    model = GradientBoostingRegressor(n_estimators=5).fit(X, y)
+
+    assert flatten_forest(model) is None
+
+
+def test_single_row_latency(forest):
+    # Loose bound: sklearn pays per-call validation and joblib dispatch,
+    # the flat engine a few NumPy ops per tree level
+    results = compare_latency(forest, flatten_forest(forest), batch_sizes=(1, 100), repeats=15)
+
+    by_size = {row["batch_size"]: row for row in results}
+    assert by_size[1]["flat_ms"] < by_size[1]["sklearn_ms"]
+    assert all(row["flat_ms"] > 0 for row in results)
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+from sqlalchemy import create_engine, text
+
+# The engine is bound at import; every test swaps in its own SQLite file
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from src.ingestion import leases  # noqa: E402
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'source.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE customer_7day_summary (id INTEGER PRIMARY KEY, quantity REAL)"))
+        conn.execute(text("CREATE TABLE pipeline_state (key TEXT PRIMARY KEY, value TEXT)"))
+        leases.create_leases_table(conn)
+        conn.execute(
+            text("INSERT INTO customer_7day_summary (id, quantity) VALUES (:id, 1.0)"),
+            [{"id": i} for i in range(1, 31)]
+        )
+
+    monkeypatch.setattr(leases, "engine", engine)
+    return engine
+
+
+def _status(engine, start_id):
+    with engine.begin() as conn:
+        return conn.execute(
+            text("SELECT status, owner, attempts FROM ingestion_leases WHERE start_id = :s"),
+            {"s": start_id}
+        ).fetchone()
+
+
+def test_workers_claim_disjoint_ranges(source):
+    first = leases.claim_lease("a", lease_rows=10)
+    second = leases.claim_lease("b", lease_rows=10)
+
+    assert first == (1, 10)
+    assert second == (11, 20)
+    assert leases.complete_lease(first[0], "a")
+    assert _status(source, 1).status == "done"
+
+
+def test_expired_lease_is_redelivered(source):
+    start_id, end_id = leases.claim_lease("a", lease_rows=10, ttl_seconds=-1)
+
+    # The lease ran out while "a" was still working: "b" reads the same rows
+    assert leases.claim_lease("b", lease_rows=10) == (start_id, end_id)
+    assert _status(source, start_id).owner == "b"
+    assert _status(source, start_id).attempts == 2
+
+    # "a" finishing late does not complete b's lease
+    assert not leases.complete_lease(start_id, "a")
+    assert leases.complete_lease(start_id, "b")
+    assert leases.claim_lease("c", lease_rows=10) == (11, 20)
+
+
+def test_abandoned_lease_is_retried_then_dead_lettered(source):
+    start_id, _ = leases.claim_lease("a", lease_rows=10, max_attempts=2)
+    leases.abandon_lease(start_id, "a")
+
+    assert leases.claim_lease("b", lease_rows=10, max_attempts=2) == (1, 10)
+    leases.abandon_lease(start_id, "b")
+
+    # Third claim: the range has used up its attempts and is skipped
+    assert leases.claim_lease("c", lease_rows=10, max_attempts=2) == (11, 20)
+    assert _status(source, start_id).status == "failed"
@@ -0,0 +1,68 @@
+import asyncio
+
+from src.serving.model_watcher import ModelFileWatcher
+
+
+def _watch(pointer, steps, poll=0.01):
+    """
+    Start a watcher on pointer, apply each step (a callable) one poll
+    interval apart, and return the versions on_change was called with.
+    """
+
+    seen = []
+
+    async def on_change(version):
+        seen.append(version)
+
+    async def run():
+        watcher = ModelFileWatcher(pointer, on_change, poll_interval_seconds=poll)
+        watcher.start(current_version="v1.ref")
+        for step in steps:
+            step()
+            await asyncio.sleep(poll * 5)
+        await watcher.stop()
+
+    asyncio.run(run())
+    return seen
+
+
+def test_new_pointer_is_picked_up(tmp_path):
+    pointer = tmp_path / "current_model.txt"
+    pointer.write_text("v1.ref")
+
+    assert _watch(pointer, [lambda: pointer.write_text("v2.ref")]) == ["v2.ref"]
+
+
+def test_empty_or_missing_pointer_keeps_the_current_model(tmp_path):
+    pointer = tmp_path / "current_model.txt"
+    pointer.write_text("v1.ref")
+
+    seen = _watch(pointer, [
+        lambda: pointer.write_text(""),
+        lambda: pointer.write_text("  \n"),
+        pointer.unlink,
+        lambda: pointer.write_text("v2.ref"),
+    ])
+
+    assert seen == ["v2.ref"]
+
+
+def test_failed_swap_is_retried(tmp_path):
+    pointer = tmp_path / "current_model.txt"
+    pointer.write_text("v1.ref")
+    calls = []
+
+    async def on_change(version):
+        calls.append(version)
+        if len(calls) == 1:
+            raise Exception("load failed")
+
+    async def run():
+        watcher = ModelFileWatcher(pointer, on_change, poll_interval_seconds=0.01)
+        watcher.start(current_version="v1.ref")
+        pointer.write_text("v2.ref")
+        await asyncio.sleep(0.1)
+        await watcher.stop()
+
+    asyncio.run(run())
+    assert calls[:2] == ["v2.ref", "v2.ref"]
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeRegressor
+
+from src.registry import blob_store, catalog, publish, retention, versioning
+
+
+POLICY = {
+    "enabled": True,
+    "keep_last_runs": 1,
+    "keep_top_runs": 0,
+    "keep_promoted_days": 30,
+    "blob_grace_minutes": 60
+}
+
+
+@pytest.fixture
+def models_dir(tmp_path, monkeypatch):
+    models = tmp_path / "models"
+    config = tmp_path / "config"
+    config.mkdir()
+
+    monkeypatch.setattr(catalog, "MODELS_DIR", models)
+    monkeypatch.setattr(catalog, "CATALOG_PATH", models / "registry.db")
+    monkeypatch.setattr(blob_store, "MODELS_DIR", models)
+    monkeypatch.setattr(blob_store, "BLOBS_DIR", models / "blobs")
+    monkeypatch.setattr(versioning, "EXPERIMENTS_DIR", models / "experiments")
+    monkeypatch.setattr(retention, "BLOBS_DIR", models / "blobs")
+    monkeypatch.setattr(retention, "EXPERIMENTS_DIR", models / "experiments")
+    monkeypatch.setattr(retention, "PROMOTED_DIR", models / "promoted")
+    monkeypatch.setattr(publish, "CONFIG_DIR", config)
+    monkeypatch.setattr(publish, "PROMOTED_DIR", models / "promoted")
+    monkeypatch.setattr(publish, "CURRENT_MODEL_FILE", models / "current_model.txt")
+    return models
+
+
+def _model(depth):
+    rng = np.random.RandomState(0)
+    X, y = rng.rand(50, 3), rng.rand(50)
+    return DecisionTreeRegressor(max_depth=depth, random_state=0).fit(X, y)
+
+
+def _register(depth, rmse=1.0):
+    run_dir = versioning.register_experiment(_model(depth), {"rmse": rmse})
+    return run_dir, blob_store.read_ref(run_dir / f"model{blob_store.REF_SUFFIX}")
+
+
+def _age_pending(minutes):
+    with catalog.transaction() as conn:
+        conn.execute(
+            "UPDATE blob_gc SET unreferenced_since = datetime(unreferenced_since, ?)",
+            (f"-{minutes} minutes",)
+        )
+
+
+def test_unreferenced_blobs_wait_out_the_grace_period(models_dir):
+    (old_run, old_blob), (_, mid_blob), (new_run, new_blob) = [_register(depth) for depth in (1, 2, 3)]
+
+    report = retention.apply_retention(policy=POLICY)
+
+    assert len(report["runs"]) == 2
+    assert not old_run.exists() and new_run.exists()
+    # Unreferenced now, but only marked: the grace period starts here
+    assert report["blobs"] == []
+    assert blob_store.blob_path(old_blob).exists()
+
+    # A checkout or cache restore resets file times; the catalog decides
+    _age_pending(POLICY["blob_grace_minutes"] + 1)
+    for digest in (old_blob, mid_blob):
+        os.utime(blob_store.blob_path(digest))
+
+    report = retention.apply_retention(policy=POLICY)
+
+    assert sorted(report["blobs"]) == sorted(f"{d}.pkl" for d in (old_blob, mid_blob))
+    assert not blob_store.blob_path(old_blob).exists()
+    assert not blob_store.blob_path(mid_blob).exists()
+    assert blob_store.blob_path(new_blob).exists()
+
+
+def test_blobs_of_earlier_passes_are_still_collected(models_dir):
+    _, first_blob = _register(1)
+    _register(2)
+
+    retention.apply_retention(policy=POLICY)
+    # Later passes remove no runs of their own
+    retention.apply_retention(policy=POLICY)
+    _age_pending(POLICY["blob_grace_minutes"] + 1)
+    report = retention.apply_retention(policy=POLICY)
+
+    assert report["runs"] == []
+    assert report["blobs"] == [f"{first_blob}.pkl"]
+    assert not blob_store.blob_path(first_blob).exists()
+
+
+def test_blob_referenced_again_is_kept(models_dir):
+    _, blob = _register(1)
+    _register(2)
+    retention.apply_retention(policy=POLICY)
+
+    # An identical model deduplicates onto the pending blob
+    _age_pending(POLICY["blob_grace_minutes"] + 1)
+    _, again = _register(1, rmse=0.5)
+    report = retention.apply_retention(policy={**POLICY, "keep_last_runs": 2})
+
+    assert again == blob
+    assert report["blobs"] == []
+    assert blob_store.blob_path(blob).exists()
+    with catalog.transaction() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM blob_gc WHERE digest=?", (blob,)).fetchone()[0] == 0
+
+
+def test_dry_run_deletes_nothing(models_dir):
+    runs = [_register(depth) for depth in (1, 2, 3)]
+    retention.apply_retention(policy=POLICY)
+    _age_pending(POLICY["blob_grace_minutes"] + 1)
+
+    report = retention.apply_retention(dry_run=True, policy=POLICY)
+
+    assert len(report["blobs"]) == 2
+    assert all(blob_store.blob_path(digest).exists() for _, digest in runs)